@@ -0,0 +1,13 @@
+from django.urls import path
+from recipes import async_views as recipes_views
+from users import async_views as users_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/recipes/', recipes_views.recipe_list),
+    path('api/recipes/<int:pk>/', recipes_views.recipe_detail),
+    path('api/tags/', recipes_views.tag_list),
+    path('api/ingredients/', recipes_views.ingredient_list),
+    path('api/users/subscriptions/', users_views.subscriptions),
+] + sync_urlpatterns
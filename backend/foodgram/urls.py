@@ -3,6 +3,7 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 from recipes.urls import router as recipes_router
+from recipes.views import short_link_redirect
 from users.urls import router as users_router
 
 api_patterns = users_router.urls + recipes_router.urls
@@ -11,4 +12,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(api_patterns)),
     path('api/auth/', include('djoser.urls.authtoken')),
+    path('s/<str:code>/', short_link_redirect, name='short-link'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,8 +1,11 @@
+from functools import partial
+
 from django.contrib import admin
-from django.db.models import Count
+from django.db import transaction
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShortLink, Tag)
+from .pantry import pantry_index
 
 
 class RecipeIngredientInline(admin.TabularInline):
@@ -27,19 +30,15 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("name", "author", "favorites_count")
+    list_display = ("name", "author", "favorites_count", "carts_count")
     search_fields = ("name", "author__username", "author__email")
     list_filter = ("tags",)
     inlines = [RecipeIngredientInline]
     ordering = ("-pub_date",)
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(favorite_count=Count("favorited_by"))
-
-    @admin.display(description="Добавлений в избранное")
-    def favorites_count(self, obj):
-        return obj.favorite_count
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        transaction.on_commit(partial(pantry_index.update, form.instance.pk))
 
 
 @admin.register(RecipeIngredient)
@@ -47,6 +46,20 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ("recipe", "ingredient", "amount")
     search_fields = ("recipe__name", "ingredient__name")
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recipe_ids = {obj.recipe_id, form.initial.get("recipe", obj.recipe_id)}
+        transaction.on_commit(partial(pantry_index.update, *recipe_ids))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        transaction.on_commit(partial(pantry_index.update, obj.recipe_id))
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list("recipe_id", flat=True))
+        super().delete_queryset(request, queryset)
+        transaction.on_commit(partial(pantry_index.update, *recipe_ids))
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
@@ -60,3 +73,10 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ("user", "recipe")
     search_fields = ("user__username", "recipe__name")
     list_filter = ("user",)
+
+
+@admin.register(ShortLink)
+class ShortLinkAdmin(admin.ModelAdmin):
+    list_display = ("code", "recipe", "clicks")
+    search_fields = ("code", "recipe__name")
+    readonly_fields = ("code", "clicks")
@@ -0,0 +1,199 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django_filters.utils import translate_validation
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from users.auth import CachedTokenAuthentication
+
+from . import cache
+from .catalogs import catalog_response, ingredient_catalog, tag_catalog
+from .filters import IngredientFilter, RecipeFilter
+from .models import Recipe
+from .pagination import RecipePagination
+from .serializers import IngredientSerializer, RecipeReadSerializer
+from .views import (IngredientViewSet, RecipeViewSet, TagViewSet,
+                    recipe_list_params)
+
+ERROR_HEADERS = ("WWW-Authenticate", "Retry-After")
+
+authentication = CachedTokenAuthentication()
+renderer = JSONRenderer()
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    response = HttpResponse(
+        renderer.render(data),
+        content_type=renderer.media_type,
+        status=status_code,
+        headers=headers,
+    )
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def render_error(request, error):
+    if isinstance(error, (AuthenticationFailed, NotAuthenticated)):
+        error.auth_header = authentication.authenticate_header(request)
+    response = exception_handler(error, {})
+    if response is None:
+        raise error
+    return render(
+        response.data,
+        response.status_code,
+        {
+            name: response[name]
+            for name in ERROR_HEADERS
+            if response.has_header(name)
+        },
+    )
+
+
+def async_read_view(handler, sync_view, login_required=False):
+    fallback = sync_to_async(sync_view)
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if (
+            request.method != "GET"
+            or "text/html" in request.headers.get("Accept", "")
+        ):
+            return await fallback(request, *args, **kwargs)
+        api_request = Request(request)
+        try:
+            credentials = await authentication.aauthenticate(request)
+            api_request.user, api_request.auth = (
+                credentials or (AnonymousUser(), None)
+            )
+            if login_required and not api_request.user.is_authenticated:
+                raise NotAuthenticated()
+            return await handler(api_request, *args, **kwargs)
+        except Exception as error:
+            return render_error(request, error)
+
+    return view
+
+
+def lookup_response(get_key):
+    key = get_key()
+    return key, cache.get_response_data(key)
+
+
+async def cached_response(request, get_key, handler, *args):
+    if request.user.is_authenticated:
+        return render(await handler(request, *args))
+    key, data = await sync_to_async(lookup_response)(get_key)
+    if data is None:
+        data = await handler(request, *args)
+        await sync_to_async(cache.set_response_data)(key, data)
+    return render(data)
+
+
+def filter_recipes(request):
+    user = request.user
+    filterset = RecipeFilter(
+        request.query_params,
+        queryset=Recipe.objects.with_user_flags(user).with_related(user),
+        request=request,
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+async def list_recipes(request):
+    paginator = RecipePagination()
+    page = await paginator.apaginate_queryset(
+        await sync_to_async(filter_recipes)(request), request
+    )
+    serializer = RecipeReadSerializer(
+        page, many=True, context={"request": request}
+    )
+    return paginator.get_paginated_response(serializer.data).data
+
+
+async def retrieve_recipe(request, pk):
+    user = request.user
+    recipe = await aget_object_or_404(
+        Recipe.objects.with_user_flags(user).with_related(user), pk=pk
+    )
+    return RecipeReadSerializer(recipe, context={"request": request}).data
+
+
+async def recipe_list_handler(request):
+    allowed = recipe_list_params(RecipePagination)
+    return await cached_response(
+        request,
+        lambda: cache.recipe_list_key(request, allowed),
+        list_recipes,
+    )
+
+
+async def recipe_detail_handler(request, pk):
+    return await cached_response(
+        request,
+        lambda: cache.recipe_detail_key(request, pk),
+        retrieve_recipe,
+        pk,
+    )
+
+
+async def catalog_handler(request, catalog):
+    response = await sync_to_async(catalog_response)(request, catalog)
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+async def tag_list_handler(request):
+    return await catalog_handler(request, tag_catalog)
+
+
+async def ingredient_list_handler(request):
+    if not request.query_params.get("name"):
+        return await catalog_handler(request, ingredient_catalog)
+    filterset = IngredientFilter(request.query_params, request=request)
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return render(
+        IngredientSerializer(
+            [ingredient async for ingredient in filterset.qs], many=True
+        ).data
+    )
+
+
+recipe_list = async_read_view(
+    recipe_list_handler,
+    RecipeViewSet.as_view(
+        {"get": "list", "post": "create"}, basename="recipes", detail=False
+    ),
+)
+recipe_detail = async_read_view(
+    recipe_detail_handler,
+    RecipeViewSet.as_view(
+        {
+            "get": "retrieve",
+            "put": "update",
+            "patch": "partial_update",
+            "delete": "destroy",
+        },
+        basename="recipes",
+        detail=True,
+    ),
+)
+tag_list = async_read_view(
+    tag_list_handler,
+    TagViewSet.as_view({"get": "list"}, basename="tags", detail=False),
+)
+ingredient_list = async_read_view(
+    ingredient_list_handler,
+    IngredientViewSet.as_view(
+        {"get": "list"}, basename="ingredients", detail=False
+    ),
+)
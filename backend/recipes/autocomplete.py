@@ -0,0 +1,52 @@
+import threading
+from bisect import bisect_left
+
+from .cache import get_version
+from .models import Ingredient
+
+
+class IngredientIndex:
+    def __init__(self, version_name):
+        self.version_name = version_name
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        version = get_version(self.version_name)
+        data = self._data
+        if data is None or data[0] != version:
+            with self._lock:
+                data = self._data
+                if data is None or data[0] != version:
+                    entries = sorted(
+                        (name.lower(), pk, name, unit)
+                        for pk, name, unit in Ingredient.objects.values_list(
+                            "id", "name", "measurement_unit"
+                        )
+                    )
+                    data = self._data = (
+                        version, [entry[0] for entry in entries], entries
+                    )
+        return data[1], data[2]
+
+    def search(self, query, limit):
+        query = query.strip().lower()
+        keys, entries = self._load()
+        matches = []
+        for position in range(bisect_left(keys, query), len(keys)):
+            if len(matches) >= limit or not keys[position].startswith(query):
+                break
+            matches.append(entries[position])
+        if query and len(matches) < limit:
+            for key, entry in zip(keys, entries):
+                if query in key and not key.startswith(query):
+                    matches.append(entry)
+                    if len(matches) >= limit:
+                        break
+        return [
+            {"id": pk, "name": name, "measurement_unit": unit}
+            for _, pk, name, unit in matches
+        ]
+
+
+ingredient_index = IngredientIndex("ingredients")
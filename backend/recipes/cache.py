@@ -0,0 +1,199 @@
+import abc
+import hashlib
+import threading
+import uuid
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .constants import (INDEX_CHANGE_TIMEOUT, INDEX_REPLAY_LIMIT,
+                        RECIPE_CACHE_TIMEOUT)
+
+VERSION_KEY = "version:{}"
+RECIPES_VERSION = "recipes"
+RECIPES_RELATED_VERSION = "recipes-related"
+RECIPE_VERSION = "recipe:{}"
+RECIPE_LIST_KEY = "recipes:list:{}:{}:{}"
+RECIPE_DETAIL_KEY = "recipes:detail:{}:{}:{}:{}"
+INDEX_VERSION_KEY = "index-version:{}"
+INDEX_CHANGE_KEY = "index-change:{}:{}"
+
+
+def get_version(name):
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*names):
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    return [
+        versions.get(key) or get_version(name)
+        for key, name in zip(keys, names)
+    ]
+
+
+def bump_version(name):
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY.format(name), version, timeout=None)
+    return version
+
+
+def get_index_version(name):
+    key = INDEX_VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 0, timeout=None)
+        version = cache.get(key, 0)
+    return version
+
+
+def next_index_version(name):
+    key = INDEX_VERSION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def _digest(value):
+    return hashlib.md5(value.encode(), usedforsecurity=False).hexdigest()
+
+
+def normalize_params(query_params, allowed):
+    params = []
+    for name in sorted(allowed.intersection(query_params)):
+        values = sorted({
+            value for value in query_params.getlist(name) if value != ""
+        })
+        if values:
+            params.append((name, values))
+    return urlencode(params, doseq=True)
+
+
+def recipe_list_key(request, allowed):
+    related, version = get_versions(RECIPES_RELATED_VERSION, RECIPES_VERSION)
+    return RECIPE_LIST_KEY.format(
+        related,
+        version,
+        _digest(
+            request.build_absolute_uri("/")
+            + normalize_params(request.query_params, allowed)
+        ),
+    )
+
+
+def recipe_detail_key(request, pk):
+    related, version = get_versions(
+        RECIPES_RELATED_VERSION, RECIPE_VERSION.format(pk)
+    )
+    return RECIPE_DETAIL_KEY.format(
+        pk, related, version, _digest(request.build_absolute_uri("/"))
+    )
+
+
+def get_response_data(key):
+    return cache.get(key)
+
+
+def set_response_data(key, data):
+    cache.set(key, data, RECIPE_CACHE_TIMEOUT)
+
+
+def invalidate_recipe(pk):
+    cache.delete(VERSION_KEY.format(RECIPE_VERSION.format(pk)))
+    bump_version(RECIPES_VERSION)
+
+
+def invalidate_recipe_relations():
+    bump_version(RECIPES_RELATED_VERSION)
+
+
+class CatalogCache:
+    def __init__(self, name, queryset, serializer_class):
+        self.name = name
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def get(self):
+        version = get_version(self.name)
+        entry = self._entry
+        if entry is None or entry[0] != version:
+            with self._lock:
+                entry = self._entry
+                if entry is None or entry[0] != version:
+                    entry = self._entry = (version, *self._render())
+        return entry[1], entry[2]
+
+    def _render(self):
+        content = JSONRenderer().render(
+            self.serializer_class(self.queryset.all(), many=True).data
+        )
+        digest = hashlib.md5(content, usedforsecurity=False).hexdigest()
+        return f'"{digest}"', content
+
+    def invalidate(self):
+        self._entry = None
+        bump_version(self.name)
+
+
+class VersionedIndex(abc.ABC):
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.RLock()
+        self._version = None
+
+    def _load(self):
+        version = get_index_version(self.name)
+        if self._version == version:
+            return
+        with self._lock:
+            if self._version == version:
+                return
+            if not self._replay(version):
+                self._rebuild()
+            self._version = version
+
+    def _replay(self, version):
+        if self._version is None or not (
+            0 < version - self._version <= INDEX_REPLAY_LIMIT
+        ):
+            return False
+        keys = [
+            INDEX_CHANGE_KEY.format(self.name, number)
+            for number in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        self._refresh({pk for key in keys for pk in changes[key]})
+        return True
+
+    @abc.abstractmethod
+    def _rebuild(self):
+        pass
+
+    @abc.abstractmethod
+    def _refresh(self, pks):
+        pass
+
+    def update(self, *pks):
+        version = next_index_version(self.name)
+        cache.set(
+            INDEX_CHANGE_KEY.format(self.name, version),
+            pks,
+            INDEX_CHANGE_TIMEOUT,
+        )
+        if self._version is not None:
+            self._load()
+
+    def invalidate(self):
+        next_index_version(self.name)
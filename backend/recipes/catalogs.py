@@ -0,0 +1,44 @@
+import threading
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .cache import CatalogCache, get_version
+from .models import Ingredient, Tag
+from .serializers import IngredientSerializer, TagSerializer
+
+tag_catalog = CatalogCache("tags", Tag.objects.all(), TagSerializer)
+ingredient_catalog = CatalogCache(
+    "ingredients", Ingredient.objects.all(), IngredientSerializer
+)
+
+
+class TagSlugMap:
+    def __init__(self, version_name):
+        self.version_name = version_name
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def get(self):
+        version = get_version(self.version_name)
+        entry = self._entry
+        if entry is None or entry[0] != version:
+            with self._lock:
+                entry = self._entry
+                if entry is None or entry[0] != version:
+                    entry = self._entry = (
+                        version,
+                        dict(Tag.objects.values_list("slug", "id")),
+                    )
+        return entry[1]
+
+
+tag_slugs = TagSlugMap(tag_catalog.name)
+
+
+def catalog_response(request, catalog):
+    etag, content = catalog.get()
+    response = HttpResponse(content, content_type="application/json")
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
@@ -4,3 +4,44 @@ RECIPE_NAME_MAX_LENGTH = 256
 INGREDIENT_NAME_MAX_LENGTH = 128
 INGREDIENT_UNIT_MAX_LENGTH = 64
 MIN_VALUE = 1
+IMAGE_VARIANTS = {
+    "thumbnail": (160, 160),
+    "card": (480, 480),
+    "full": (1280, 1280),
+}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+SHOPPING_LIST_TITLE = "Список покупок"
+SHOPPING_LIST_FILENAME = "список_покупок"
+SHOPPING_LIST_CHUNK_SIZE = 500
+INGREDIENT_AUTOCOMPLETE_LIMIT = 20
+INGREDIENT_AUTOCOMPLETE_MAX_LIMIT = 100
+RECIPE_CACHE_TIMEOUT = 300
+SEARCH_CONFIG = "russian"
+SEARCH_TRIGRAM_THRESHOLD = 0.3
+SEARCH_RESULTS_LIMIT = 1000
+PANTRY_LOAD_CHUNK_SIZE = 5000
+INDEX_CHANGE_TIMEOUT = 60 * 60
+INDEX_REPLAY_LIMIT = 100
+RECIPE_ORDERINGS = {
+    "popular": ("-favorites_count", "-pub_date", "-id"),
+    "trending": ("-trending_score", "-pub_date", "-id"),
+}
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_WINDOW_DAYS = 14
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_CART_WEIGHT = 0.5
+TRENDING_BATCH_SIZE = 1000
+FEED_TIMELINE_MIN_FOLLOWING = 1000
+FEED_TIMELINE_BATCH_SIZE = 5000
+TAGS_MATCH_ANY = "any"
+TAGS_MATCH_ALL = "all"
+SHORT_LINK_CODE_LENGTH = 6
+SHORT_LINK_CODE_MAX_LENGTH = 16
+SHORT_LINK_CODE_ATTEMPTS = 5
+SHORT_LINK_CACHE_TIMEOUT = 24 * 60 * 60
+SHORT_LINK_LOCAL_CACHE_SIZE = 10000
+SHORT_LINK_LOCAL_CACHE_TIMEOUT = 300
+SHORT_LINK_CLICKS_FLUSH_SIZE = 100
+SHORT_LINK_CLICKS_FLUSH_INTERVAL = 30
+RECIPE_PAGE_URL = "/recipes/{}"
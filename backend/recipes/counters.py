@@ -0,0 +1,45 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Follow
+
+from .models import Favorite, Recipe, ShoppingCart, User
+
+COUNTERS = (
+    (Recipe, "favorites_count", Favorite, "recipe"),
+    (Recipe, "carts_count", ShoppingCart, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "followers_count", Follow, "author"),
+)
+
+
+def change_counter(model, pk, field, delta):
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def actual_count(source, relation):
+    return Coalesce(
+        Subquery(
+            source.objects.filter(**{relation: OuterRef("pk")})
+            .order_by()
+            .values(relation)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def reconcile(fix=True):
+    results = []
+    for model, field, source, relation in COUNTERS:
+        expected = actual_count(source, relation)
+        stale = model.objects.exclude(**{field: expected})
+        if fix:
+            changed = stale.update(**{field: expected})
+        else:
+            changed = stale.count()
+        results.append((model, field, changed))
+    return results
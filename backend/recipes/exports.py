@@ -0,0 +1,86 @@
+import csv
+import os
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+from .constants import SHOPPING_LIST_TITLE
+
+PDF_FONT_NAME = "ShoppingListFont"
+PDF_FALLBACK_FONT = "Helvetica"
+PDF_FONT_SIZE = 12
+PDF_TITLE_SIZE = 16
+PDF_MARGIN = 20 * mm
+PDF_LINE_HEIGHT = 7 * mm
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def format_item(item):
+    return (
+        f"{item['ingredient__name']} "
+        f"({item['ingredient__measurement_unit']}) - {item['amount']}"
+    )
+
+
+def render_txt(items):
+    yield f"{SHOPPING_LIST_TITLE}\n\n"
+    for item in items:
+        yield f"{format_item(item)}\n"
+
+
+def render_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("Ингредиент", "Единица измерения", "Количество"))
+    for item in items:
+        yield writer.writerow((
+            item["ingredient__name"],
+            item["ingredient__measurement_unit"],
+            item["amount"],
+        ))
+
+
+def _pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    path = settings.SHOPPING_LIST_PDF_FONT
+    if not path or not os.path.exists(path):
+        return PDF_FALLBACK_FONT
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, path))
+    return PDF_FONT_NAME
+
+
+def render_pdf(items):
+    buffer = BytesIO()
+    font = _pdf_font()
+    canvas = Canvas(buffer, pagesize=A4)
+    width, height = A4
+    canvas.setFont(font, PDF_TITLE_SIZE)
+    canvas.drawString(PDF_MARGIN, height - PDF_MARGIN, SHOPPING_LIST_TITLE)
+    y = height - PDF_MARGIN - 2 * PDF_LINE_HEIGHT
+    canvas.setFont(font, PDF_FONT_SIZE)
+    for item in items:
+        if y < PDF_MARGIN:
+            canvas.showPage()
+            canvas.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        canvas.drawString(PDF_MARGIN, y, format_item(item))
+        y -= PDF_LINE_HEIGHT
+    canvas.save()
+    return buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    "txt": ("text/plain; charset=utf-8", render_txt),
+    "csv": ("text/csv; charset=utf-8", render_csv),
+    "pdf": ("application/pdf", render_pdf),
+}
+STREAMED_FORMATS = frozenset(("txt", "csv"))
@@ -0,0 +1,93 @@
+from django.db.models import Count
+
+from users.models import Follow
+
+from .constants import FEED_TIMELINE_BATCH_SIZE, FEED_TIMELINE_MIN_FOLLOWING
+from .models import FeedEntry, Recipe, User
+
+
+def followed_authors(user):
+    return Follow.objects.filter(user=user).values("author_id")
+
+
+def feed_recipes(queryset, user):
+    return queryset.filter(author_id__in=followed_authors(user))
+
+
+def _insert_entries(user_ids, recipes):
+    entries = []
+    for recipe_id, pub_date in recipes:
+        entries.extend(
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+            for user_id in user_ids
+        )
+        if len(entries) >= FEED_TIMELINE_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def add_recipes(recipes):
+    followers = {}
+    for author_id, user_id in Follow.objects.filter(
+        author_id__in={recipe.author_id for recipe in recipes},
+        user__feed_timeline=True,
+    ).values_list("author_id", "user_id"):
+        followers.setdefault(author_id, []).append(user_id)
+    for recipe in recipes:
+        if recipe.author_id in followers:
+            _insert_entries(
+                followers[recipe.author_id], [(recipe.pk, recipe.pub_date)]
+            )
+
+
+def add_recipe(recipe):
+    add_recipes([recipe])
+
+
+def add_author(user, author):
+    if user.feed_timeline:
+        _insert_entries(
+            [user.pk],
+            Recipe.objects.filter(author=author)
+            .values_list("id", "pub_date")
+            .iterator(chunk_size=FEED_TIMELINE_BATCH_SIZE),
+        )
+
+
+def remove_author(user, author):
+    if user.feed_timeline:
+        FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def rebuild(user):
+    FeedEntry.objects.filter(user=user).delete()
+    _insert_entries(
+        [user.pk],
+        feed_recipes(Recipe.objects.order_by(), user)
+        .values_list("id", "pub_date")
+        .iterator(chunk_size=FEED_TIMELINE_BATCH_SIZE),
+    )
+
+
+def timeline_candidates(min_following=FEED_TIMELINE_MIN_FOLLOWING):
+    return (
+        Follow.objects.values("user_id")
+        .annotate(total=Count("author_id"))
+        .filter(total__gte=min_following)
+        .values("user_id")
+    )
+
+
+def sync_timelines(min_following=FEED_TIMELINE_MIN_FOLLOWING):
+    enabled = User.objects.filter(pk__in=timeline_candidates(min_following))
+    disabled = User.objects.filter(feed_timeline=True).exclude(
+        pk__in=timeline_candidates(min_following)
+    )
+    FeedEntry.objects.filter(user__in=disabled).delete()
+    disabled_count = disabled.update(feed_timeline=False)
+    enabled.update(feed_timeline=True)
+    users = list(enabled)
+    for user in users:
+        rebuild(user)
+    return len(users), disabled_count
@@ -0,0 +1,25 @@
+from rest_framework import serializers
+
+from .constants import IMAGE_VARIANTS
+
+
+class ImageVariantsField(serializers.Field):
+    def __init__(self, image_field, variants_field, **kwargs):
+        self.image_field = image_field
+        self.variants_field = variants_field
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        if not image:
+            return None
+        variants = getattr(instance, self.variants_field) or {}
+        request = self.context.get("request")
+        urls = {}
+        for variant in IMAGE_VARIANTS:
+            name = variants.get(variant)
+            url = image.storage.url(name) if name else image.url
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls
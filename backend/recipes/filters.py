@@ -1,18 +1,69 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
+from .catalogs import tag_slugs
+from .constants import (RECIPE_ORDERINGS, SEARCH_RESULTS_LIMIT, TAGS_MATCH_ALL,
+                        TAGS_MATCH_ANY)
 from .models import Ingredient, Recipe
+from .search import search_recipes
 
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name="tags__slug")
+    tags = filters.MultipleChoiceFilter(
+        choices=lambda: [(slug, slug) for slug in tag_slugs.get()],
+        method="filter_tags",
+    )
+    tags_match = filters.ChoiceFilter(
+        choices=[
+            (TAGS_MATCH_ANY, TAGS_MATCH_ANY),
+            (TAGS_MATCH_ALL, TAGS_MATCH_ALL),
+        ],
+        method="filter_tags_match",
+    )
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(
         method="filter_is_in_shopping_cart"
     )
+    search = filters.CharFilter(
+        method="filter_search",
+        help_text=(
+            "Поиск по названию и описанию. Без PostgreSQL возвращаются "
+            f"только {SEARCH_RESULTS_LIMIT} лучших совпадений"
+        ),
+    )
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method="filter_ordering",
+    )
 
     class Meta:
         model = Recipe
-        fields = ("tags", "author", "is_favorited", "is_in_shopping_cart")
+        fields = (
+            "tags",
+            "tags_match",
+            "author",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+            "ordering",
+        )
+
+    def filter_tags(self, queryset, name, value):
+        slugs = tag_slugs.get()
+        tag_ids = [slugs[slug] for slug in value if slug in slugs]
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef("pk")
+        )
+        if self.form.cleaned_data.get("tags_match") == TAGS_MATCH_ALL:
+            for tag_id in tag_ids:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag_id=tag_id))
+                )
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag_id__in=tag_ids)))
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
@@ -24,6 +75,14 @@ class RecipeFilter(filters.FilterSet):
             return queryset.filter(in_cart__user=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
 
 class IngredientFilter(filters.FilterSet):
     name = filters.CharFilter(lookup_expr="istartswith")
@@ -0,0 +1,110 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .cache import invalidate_recipe, invalidate_recipe_relations
+from .constants import (IMAGE_VARIANT_QUALITY, IMAGE_VARIANT_WORKERS,
+                        IMAGE_VARIANTS)
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=IMAGE_VARIANT_WORKERS,
+    thread_name_prefix="image-variants",
+)
+
+
+def variant_name(name, variant):
+    head, tail = os.path.split(os.path.splitext(name)[0])
+    return os.path.join(head, "variants", f"{tail}_{variant}.jpg")
+
+
+def _to_rgb(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def build_variants(field_file):
+    storage = field_file.storage
+    with field_file.open("rb") as source:
+        image = _to_rgb(Image.open(source))
+    variants = {}
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        resized.save(
+            buffer,
+            "JPEG",
+            quality=IMAGE_VARIANT_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        name = variant_name(field_file.name, variant)
+        if storage.exists(name):
+            storage.delete(name)
+        variants[variant] = storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def delete_variants(storage, variants):
+    for name in variants.values():
+        storage.delete(name)
+
+
+def _generate(model, pk, field_name, variants_field, name, stale):
+    close_old_connections()
+    try:
+        instance = model.objects.filter(pk=pk).only(field_name).first()
+        if instance is None:
+            return
+        field_file = getattr(instance, field_name)
+        delete_variants(field_file.storage, stale)
+        if field_file.name != name:
+            return
+        variants = build_variants(field_file)
+        updated = model.objects.filter(pk=pk, **{field_name: name}).update(
+            **{variants_field: variants}
+        )
+        if not updated:
+            delete_variants(field_file.storage, variants)
+        elif model is Recipe:
+            invalidate_recipe(pk)
+        else:
+            invalidate_recipe_relations()
+    except Exception:
+        logger.exception(
+            "Не удалось создать превью %s для %s #%s", name, model.__name__, pk
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(instance, field_name, variants_field, stale=None):
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+    transaction.on_commit(
+        partial(
+            executor.submit,
+            _generate,
+            type(instance),
+            instance.pk,
+            field_name,
+            variants_field,
+            field_file.name,
+            dict(stale or {}),
+        )
+    )
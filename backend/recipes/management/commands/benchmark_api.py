@@ -0,0 +1,327 @@
+import json
+import statistics
+import time
+from collections import Counter, defaultdict
+
+import yaml
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from recipes.constants import IMAGE_VARIANTS
+from recipes.images import variant_name
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShortLink, Tag, User)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import Follow
+
+SCHEMA_PATH = settings.BASE_DIR.parent / 'docs' / 'openapi-schema.yml'
+PATH_OBJECTS = (
+    ('/api/tags/', 'tag'),
+    ('/api/ingredients/', 'ingredient'),
+    ('/api/recipes/', 'recipe'),
+    ('/api/users/', 'author'),
+)
+METHODS = ('get', 'post', 'put', 'patch', 'delete')
+RECIPE_LIST_PATH = '/api/recipes/'
+RECIPE_DETAIL_PATH = '/api/recipes/{id}/'
+
+
+def percentile(samples, value):
+    if len(samples) < 2:
+        return samples[0] if samples else 0
+    return statistics.quantiles(samples, n=100)[value - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет задержки и число SQL-запросов для эндпоинтов '
+        'из OpenAPI-схемы и сохраняет отчёт в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schema', default=str(SCHEMA_PATH),
+            help='Путь к OpenAPI-схеме',
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=30,
+            help='Число замеров каждого эндпоинта',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Число прогревочных запросов каждого эндпоинта',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого идут запросы',
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Выполнять запросы без авторизации',
+        )
+        parser.add_argument(
+            '--output',
+            help='Сохранить отчёт в JSON-файл',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Сравнить с ранее сохранённым отчётом',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базового отчёта',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['schema'], encoding='utf-8') as source:
+                schema = yaml.safe_load(source)
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть схему: {error}')
+        self.iterations = options['iterations']
+        self.warmup = options['warmup']
+        self.samples = defaultdict(list)
+        self.objects = self.get_objects(options['user'])
+        self.client = APIClient(HTTP_HOST=self.get_host())
+        token_created = False
+        if not options['anonymous']:
+            token, token_created = Token.objects.get_or_create(
+                user=self.objects['user']
+            )
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        last_link = ShortLink.objects.aggregate(last=Max('id'))['last'] or 0
+        try:
+            skipped = self.run(schema)
+        finally:
+            ShortLink.objects.filter(id__gt=last_link).delete()
+            if token_created:
+                token.delete()
+        report = {
+            'schema': options['schema'],
+            'database': connection.vendor,
+            'iterations': self.iterations,
+            'anonymous': options['anonymous'],
+            'dataset': {
+                model.__name__.lower(): model.objects.count()
+                for model in (
+                    User, Recipe, Ingredient, Tag, Follow, Favorite,
+                    ShoppingCart,
+                )
+            },
+            'endpoints': {
+                name: self.summarize(samples)
+                for name, samples in self.samples.items()
+            },
+            'skipped': skipped,
+        }
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(
+                    report, output, ensure_ascii=False, indent=2,
+                    sort_keys=True,
+                )
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['tolerance'])
+
+    def get_host(self):
+        for host in settings.ALLOWED_HOSTS:
+            if host and host != '*':
+                return host.lstrip('.')
+        return 'localhost'
+
+    def get_objects(self, email):
+        users = User.objects.all()
+        if email:
+            users = users.filter(email=email)
+        else:
+            users = users.filter(
+                follower__isnull=False,
+                favorites__isnull=False,
+                shopping_cart__isnull=False,
+            ).distinct()
+        user = users.first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователя для замеров: запустите generate_dataset'
+            )
+        objects = {
+            'user': user,
+            'recipe': Recipe.objects.exclude(author=user)
+            .exclude(favorited_by__user=user)
+            .exclude(in_cart__user=user)
+            .first(),
+            'author': User.objects.exclude(pk=user.pk)
+            .exclude(following__user=user)
+            .first(),
+            'tag': Tag.objects.first(),
+            'ingredient': Ingredient.objects.first(),
+        }
+        missing = [name for name, value in objects.items() if value is None]
+        if missing:
+            raise CommandError(
+                f'Недостаточно данных для замеров: {", ".join(missing)}'
+            )
+        return objects
+
+    def resolve(self, path):
+        if '{id}' not in path:
+            return path
+        for prefix, name in PATH_OBJECTS:
+            if path.startswith(prefix):
+                return path.replace('{id}', str(self.objects[name].pk))
+        raise CommandError(f'Не удалось подставить параметры в {path}')
+
+    def run(self, schema):
+        paths = schema.get('paths') or {}
+        skipped = {}
+        for path, operations in paths.items():
+            methods = [method for method in METHODS if method in operations]
+            url = self.resolve(path)
+            if 'get' in methods:
+                self.repeat(lambda: self.measure('get', path, url))
+            if '{id}' in path and {'post', 'delete'} <= set(methods):
+                self.repeat(lambda: self.measure_pair(path, url))
+                methods = [
+                    method for method in methods
+                    if method not in ('post', 'delete')
+                ]
+            for method in methods:
+                if method != 'get':
+                    skipped[f'{method.upper()} {path}'] = (
+                        'нет парной операции для отката изменений'
+                    )
+        if RECIPE_LIST_PATH in paths and RECIPE_DETAIL_PATH in paths:
+            payload = self.recipe_payload(schema)
+            self.repeat(lambda: self.measure_recipe_cycle(payload))
+            for method in ('post', 'patch', 'delete'):
+                for path in (RECIPE_LIST_PATH, RECIPE_DETAIL_PATH):
+                    skipped.pop(f'{method.upper()} {path}', None)
+        return skipped
+
+    def repeat(self, action):
+        for iteration in range(self.warmup + self.iterations):
+            self.recording = iteration >= self.warmup
+            action()
+
+    def measure(self, method, path, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if self.recording:
+            self.samples[f'{method.upper()} {path}'].append(
+                (elapsed * 1000, len(context.captured_queries),
+                 response.status_code)
+            )
+        return response
+
+    def measure_pair(self, path, url):
+        self.measure('post', path, url)
+        self.measure('delete', path, url)
+
+    def recipe_payload(self, schema):
+        properties = schema['components']['schemas']['RecipeCreate'][
+            'properties'
+        ]
+        ingredients = Ingredient.objects.values_list('id', flat=True)[:3]
+        return {
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in ingredients
+            ],
+            'tags': [self.objects['tag'].pk],
+            'image': properties['image']['example'],
+            'name': 'Рецепт для замеров',
+            'text': 'Описание рецепта для замеров',
+            'cooking_time': 10,
+        }
+
+    def measure_recipe_cycle(self, payload):
+        response = self.measure(
+            'post', RECIPE_LIST_PATH, RECIPE_LIST_PATH, payload
+        )
+        if response.status_code != 201:
+            return
+        pk = response.data['id']
+        url = RECIPE_DETAIL_PATH.format(id=pk)
+        images = {self.recipe_image(pk)}
+        self.measure(
+            'patch', RECIPE_DETAIL_PATH, url,
+            {**payload, 'name': 'Изменённый рецепт для замеров'},
+        )
+        images.add(self.recipe_image(pk))
+        response = self.measure('delete', RECIPE_DETAIL_PATH, url)
+        if response.status_code == 204:
+            self.delete_images(images)
+
+    def recipe_image(self, pk):
+        return Recipe.objects.filter(pk=pk).values_list(
+            'image', flat=True
+        ).first()
+
+    def delete_images(self, names):
+        for name in filter(None, names):
+            default_storage.delete(name)
+            for variant in IMAGE_VARIANTS:
+                default_storage.delete(variant_name(name, variant))
+
+    def summarize(self, samples):
+        latencies = sorted(latency for latency, _, _ in samples)
+        queries = [count for _, count, _ in samples]
+        statuses = Counter(status for _, _, status in samples)
+        return {
+            'runs': len(samples),
+            'status': statuses.most_common(1)[0][0],
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries': max(queries),
+        }
+
+    def print_report(self, report):
+        for name, stats in sorted(report['endpoints'].items()):
+            self.stdout.write(
+                f'{name}: {stats["status"]}, '
+                f'p50 {stats["p50_ms"]} ms, p95 {stats["p95_ms"]} ms, '
+                f'p99 {stats["p99_ms"]} ms, запросов {stats["queries"]}'
+            )
+        for name, reason in sorted(report['skipped'].items()):
+            self.stdout.write(f'{name}: пропущено, {reason}')
+
+    def compare(self, report, path, tolerance):
+        try:
+            with open(path, encoding='utf-8') as source:
+                baseline = json.load(source)['endpoints']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        regressions = []
+        for name, stats in sorted(report['endpoints'].items()):
+            old = baseline.get(name)
+            if old is None:
+                continue
+            if stats['queries'] > old['queries']:
+                regressions.append(
+                    f'{name}: запросов {old["queries"]} -> '
+                    f'{stats["queries"]}'
+                )
+            if stats['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p95 {old["p95_ms"]} -> {stats["p95_ms"]} ms'
+                )
+            if stats['status'] != old['status']:
+                regressions.append(
+                    f'{name}: статус {old["status"]} -> {stats["status"]}'
+                )
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f'Найдено регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено'))
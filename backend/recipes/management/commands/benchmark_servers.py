@@ -0,0 +1,196 @@
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?cursor=',
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+    '/api/users/subscriptions/',
+)
+START_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(kind, port, workers):
+    if kind == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers),
+            'foodgram.wsgi',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn',
+        '--host', '127.0.0.1',
+        '--port', str(port),
+        '--workers', str(workers),
+        '--no-access-log',
+        'foodgram.asgi:application',
+    ]
+
+
+def percentile(samples, value):
+    if len(samples) < 2:
+        return samples[0] if samples else 0
+    return statistics.quantiles(samples, n=100)[value - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность эндпоинтов чтения '
+        'под WSGI (gunicorn) и ASGI (uvicorn) при одинаковой конкурентности'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*', default=PATHS,
+            help='Пути для нагрузки',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Число процессов каждого сервера',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Число одновременных клиентов',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Число запросов на каждый путь',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=20,
+            help='Число прогревочных запросов на каждый путь',
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен для авторизованных запросов',
+        )
+        parser.add_argument(
+            '--servers', nargs='+', choices=('wsgi', 'asgi'),
+            default=('wsgi', 'asgi'),
+            help='Серверы для сравнения',
+        )
+        parser.add_argument(
+            '--output',
+            help='Сохранить результаты в JSON-файл',
+        )
+
+    def handle(self, *args, **options):
+        self.local = threading.local()
+        self.headers = {}
+        if options['token']:
+            self.headers['Authorization'] = f'Token {options["token"]}'
+        report = {
+            'workers': options['workers'],
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'results': {},
+        }
+        for kind in options['servers']:
+            report['results'][kind] = self.run_server(kind, options)
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def run_server(self, kind, options):
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        process = subprocess.Popen(
+            server_command(kind, port, options['workers']),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            self.wait_ready(process, base_url)
+            results = {}
+            for path in options['paths']:
+                self.load(base_url + path, options['warmup'], options)
+                results[path] = self.load(
+                    base_url + path, options['requests'], options
+                )
+            return results
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=START_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def wait_ready(self, process, base_url):
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(
+                    'Сервер не запустился: '
+                    + process.stderr.read().decode(errors='replace')
+                )
+            try:
+                requests.get(f'{base_url}/api/tags/', timeout=1)
+                return
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        raise CommandError(f'Сервер {base_url} не ответил вовремя')
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers.update(self.headers)
+        return self.local.session
+
+    def fetch(self, url):
+        started = time.perf_counter()
+        response = self.session().get(url)
+        return time.perf_counter() - started, response.status_code
+
+    def load(self, url, count, options):
+        if not count:
+            return None
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            samples = list(executor.map(self.fetch, [url] * count))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency * 1000 for latency, _ in samples)
+        return {
+            'rps': round(count / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'errors': sum(1 for _, code in samples if code >= 400),
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'workers={report["workers"]} '
+            f'concurrency={report["concurrency"]} '
+            f'requests={report["requests"]}'
+        )
+        results = report['results']
+        paths = next(iter(results.values()), {})
+        for path in paths:
+            self.stdout.write(path)
+            for kind, stats in results.items():
+                stats = stats[path]
+                self.stdout.write(
+                    f'  {kind}: {stats["rps"]} req/s, '
+                    f'p50 {stats["p50_ms"]} ms, '
+                    f'p95 {stats["p95_ms"]} ms, '
+                    f'p99 {stats["p99_ms"]} ms, '
+                    f'ошибок {stats["errors"]}'
+                )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+from recipes.constants import FEED_TIMELINE_MIN_FOLLOWING
+from recipes.feed import sync_timelines
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит предрассчитанные ленты для пользователей '
+        'с большим числом подписок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-following', type=int,
+            default=FEED_TIMELINE_MIN_FOLLOWING,
+            help='Минимальное число подписок для предрассчитанной ленты',
+        )
+
+    def handle(self, *args, **options):
+        with atomic():
+            built, dropped = sync_timelines(options['min_following'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Построено лент: {built}, отключено: {dropped}'
+            )
+        )
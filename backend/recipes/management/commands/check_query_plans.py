@@ -0,0 +1,135 @@
+import json
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+WATCHED_TABLES = {
+    'recipes_recipe',
+    'recipes_recipe_tags',
+    'recipes_recipeingredient',
+    'recipes_ingredient',
+    'recipes_favorite',
+    'recipes_shoppingcart',
+    'recipes_shoppinglistitem',
+    'users_user',
+    'users_follow',
+    'recipes_feedentry',
+}
+INDEX_SCANS = {'Index Scan', 'Index Only Scan'}
+DECLARE_CURSOR = re.compile(r'^DECLARE .*? CURSOR .*?FOR (SELECT .*)$', re.S)
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет, что запросы горячих эндпоинтов не фильтруют '
+        'большие таблицы полным сканированием'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Проверка планов доступна только для PostgreSQL'
+            )
+        user = (
+            User.objects.filter(
+                follower__isnull=False, shopping_cart__isnull=False
+            ).first()
+            or User.objects.first()
+        )
+        recipe = Recipe.objects.first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        if not all((user, recipe, tag, ingredient)):
+            raise CommandError(
+                'Недостаточно данных: заполните базу перед проверкой'
+            )
+        urls = [
+            '/api/recipes/',
+            '/api/recipes/?cursor=',
+            '/api/recipes/?ordering=popular',
+            '/api/recipes/?ordering=trending&cursor=',
+            f'/api/recipes/?tags={tag.slug}',
+            f'/api/recipes/?tags={tag.slug}&tags_match=all',
+            f'/api/recipes/?author={recipe.author_id}',
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?is_in_shopping_cart=1',
+            f'/api/recipes/{recipe.id}/',
+            f'/api/ingredients/?name={quote(ingredient.name)}',
+            '/api/users/subscriptions/',
+            '/api/recipes/feed/',
+            '/api/recipes/download_shopping_cart/',
+        ]
+        client = APIClient(HTTP_HOST=self.get_host())
+        client.force_authenticate(user)
+        failures = 0
+        for url in urls:
+            failures += self.check_url(client, url, options['verbosity'])
+        if failures:
+            raise CommandError(
+                f'Полное сканирование таблиц в {failures} запросах'
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы'))
+
+    def get_host(self):
+        for host in settings.ALLOWED_HOSTS:
+            if host and host != '*':
+                return host.lstrip('.')
+        return 'localhost'
+
+    def check_url(self, client, url, verbosity):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}')
+        failures = 0
+        for query in context.captured_queries:
+            sql = query['sql'].strip()
+            match = DECLARE_CURSOR.match(sql)
+            if match:
+                sql = match.group(1)
+            if not sql.upper().startswith('SELECT'):
+                continue
+            plan = self.explain(sql)
+            scans = sorted(set(self.full_scans(plan['Plan'])))
+            if scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{url}: полное сканирование {", ".join(scans)}'
+                ))
+            if scans or verbosity > 1:
+                formatted = json.dumps(plan, ensure_ascii=False, indent=2)
+                self.stdout.write(f'{sql}\n{formatted}\n')
+        if not failures:
+            self.stdout.write(f'{url}: OK')
+        return failures
+
+    def full_scans(self, node):
+        table = node.get('Relation Name')
+        if table in WATCHED_TABLES:
+            node_type = node['Node Type']
+            if 'Filter' in node and (
+                node_type == 'Seq Scan'
+                or node_type in INDEX_SCANS and 'Index Cond' not in node
+            ):
+                yield f'{node_type} on {table}'
+        for child in node.get('Plans', ()):
+            yield from self.full_scans(child)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]
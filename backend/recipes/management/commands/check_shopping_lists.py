@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic
+from recipes.shopping_list import find_mismatches, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сводные списки покупок с содержимым корзин'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, nargs='+', dest='user_ids',
+            help='Проверить только указанных пользователей',
+        )
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Пересобрать списки пользователей с расхождениями',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = find_mismatches(options['user_ids'])
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
+            return
+        for user_id, ingredient_id, expected, actual in mismatches:
+            self.stdout.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'ожидается {expected}, записано {actual}'
+            )
+        user_ids = sorted({user_id for user_id, *_ in mismatches})
+        if not options['fix']:
+            raise CommandError(
+                f'Найдено {len(mismatches)} расхождений '
+                f'у {len(user_ids)} пользователей'
+            )
+        with atomic():
+            rebuild(user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Списки {len(user_ids)} пользователей пересобраны'
+            )
+        )
@@ -0,0 +1,48 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from recipes.transfer import export_records
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты со связанными данными в формате NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки, по умолчанию стандартный вывод',
+        )
+        parser.add_argument(
+            '--no-images', action='store_true',
+            help='Не включать содержимое изображений',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки при чтении из базы',
+        )
+
+    def handle(self, *args, **options):
+        to_stdout = options['path'] == '-'
+        output = (
+            sys.stdout if to_stdout
+            else open(options['path'], 'w', encoding='utf-8')
+        )
+        progress = self.stderr if to_stdout else self.stdout
+        total = 0
+        try:
+            for record in export_records(
+                include_images=not options['no_images'],
+                chunk_size=options['batch_size'],
+            ):
+                output.write(json.dumps(record, ensure_ascii=False))
+                output.write('\n')
+                total += 1
+                if total % options['batch_size'] == 0:
+                    progress.write(f'Выгружено записей: {total}')
+        finally:
+            if not to_stdout:
+                output.close()
+        progress.write(
+            self.style.SUCCESS(f'Выгрузка завершена, записей: {total}')
+        )
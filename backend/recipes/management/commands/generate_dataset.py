@@ -0,0 +1,291 @@
+import io
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+from recipes import feed, shopping_list
+from recipes.cache import (RECIPES_VERSION, bump_version,
+                           invalidate_recipe_relations)
+from recipes.catalogs import ingredient_catalog, tag_catalog
+from recipes.counters import reconcile
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag, User)
+from recipes.pantry import pantry_index
+from recipes.search import search_index
+from recipes.trending import compute_scores, store_scores
+from users.models import Follow
+
+DATASET_PASSWORD = 'dataset-password'
+IMAGE_NAME = 'recipes/images/dataset.jpg'
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+WORDS = (
+    'суп', 'салат', 'пирог', 'рагу', 'каша', 'запеканка', 'паста', 'соус',
+    'томатный', 'грибной', 'куриный', 'овощной', 'сырный', 'летний',
+    'острый', 'домашний', 'быстрый', 'сладкий', 'с зеленью', 'по-деревенски',
+)
+PUB_DATE_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+PUB_DATE_SPREAD_DAYS = 365
+MANIFEST_NAME = '{}.dataset.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетический набор пользователей, рецептов, ингредиентов, '
+        'подписок, избранного и корзин для нагрузочного тестирования'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients', type=int, default=2000,
+            help='Число новых ингредиентов, 0 - использовать существующие',
+        )
+        parser.add_argument(
+            '--tags', type=int, default=10,
+            help='Число новых тегов, 0 - использовать существующие',
+        )
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на одного пользователя',
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=30,
+            help='Рецептов в избранном одного пользователя',
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Рецептов в корзине одного пользователя',
+        )
+        parser.add_argument(
+            '--recipe-ingredients', type=int, default=8,
+            help='Наибольшее число ингредиентов в рецепте',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--prefix', default='dataset',
+            help='Префикс имён пользователей, тегов и ингредиентов',
+        )
+        parser.add_argument(
+            '--password', default=DATASET_PASSWORD,
+            help='Пароль всех создаваемых пользователей',
+        )
+        parser.add_argument(
+            '--manifest',
+            help='Файл со списком созданных объектов, по умолчанию '
+                 '<префикс>.dataset.json рядом с manage.py',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить данные, записанные в файл созданных объектов',
+        )
+
+    def handle(self, *args, **options):
+        minimum = ('users', 'recipes', 'recipe_ingredients')
+        if min(options[name] for name in minimum) < 1:
+            raise CommandError(
+                'Нужны хотя бы один пользователь, рецепт '
+                'и ингредиент в рецепте'
+            )
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.manifest = options['manifest'] or (
+            settings.BASE_DIR / MANIFEST_NAME.format(self.prefix)
+        )
+        if options['clear']:
+            self.clear()
+        elif User.objects.filter(
+            username__startswith=f'{self.prefix}_'
+        ).exists():
+            raise CommandError(
+                f'Данные с префиксом {self.prefix} уже есть: '
+                'используйте --clear или другой --prefix'
+            )
+        with transaction.atomic():
+            created_tags = self.create_tags(options['tags'])
+            created_ingredients = self.create_ingredients(
+                options['ingredients']
+            )
+            tags = created_tags or list(Tag.objects.all())
+            ingredients = created_ingredients or list(Ingredient.objects.all())
+            if not tags or not ingredients:
+                raise CommandError('Нет тегов или ингредиентов для рецептов')
+            users = self.create_users(options['users'], options['password'])
+            recipes = self.create_recipes(options['recipes'], users)
+            self.create_recipe_relations(
+                recipes, tags, ingredients, options['recipe_ingredients']
+            )
+            self.create_user_relations(
+                Follow, 'author_id', users, users, options['follows']
+            )
+            self.create_user_relations(
+                Favorite, 'recipe_id', users, recipes, options['favorites']
+            )
+            self.create_user_relations(
+                ShoppingCart, 'recipe_id', users, recipes, options['carts']
+            )
+            reconcile()
+            shopping_list.rebuild([user.pk for user in users])
+            feed.sync_timelines()
+            self.write_manifest(users, created_tags, created_ingredients)
+        self.refresh_caches()
+        store_scores(compute_scores())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)}, '
+            f'ингредиентов: {len(ingredients)}, тегов: {len(tags)}'
+        ))
+
+    def write_manifest(self, users, tags, ingredients):
+        manifest = {
+            'users': [user.pk for user in users],
+            'tags': [tag.pk for tag in tags],
+            'ingredients': [ingredient.pk for ingredient in ingredients],
+        }
+        with open(self.manifest, 'w', encoding='utf-8') as output:
+            json.dump(manifest, output)
+
+    def clear(self):
+        try:
+            with open(self.manifest, encoding='utf-8') as source:
+                manifest = json.load(source)
+        except FileNotFoundError:
+            if User.objects.filter(
+                username__startswith=f'{self.prefix}_'
+            ).exists():
+                raise CommandError(
+                    f'Нет файла {self.manifest}: удалить можно только '
+                    'данные, созданные этой командой'
+                )
+            return
+        except (OSError, ValueError) as error:
+            raise CommandError(
+                f'Не удалось прочитать {self.manifest}: {error}'
+            )
+        with transaction.atomic():
+            for model, name in (
+                (User, 'users'), (Tag, 'tags'), (Ingredient, 'ingredients'),
+            ):
+                ids = manifest.get(name, [])
+                for start in range(0, len(ids), self.batch_size):
+                    model.objects.filter(
+                        pk__in=ids[start:start + self.batch_size]
+                    ).delete()
+            reconcile()
+        os.remove(self.manifest)
+        self.refresh_caches()
+
+    def refresh_caches(self):
+        tag_catalog.invalidate()
+        ingredient_catalog.invalidate()
+        invalidate_recipe_relations()
+        bump_version(RECIPES_VERSION)
+        search_index.invalidate()
+        pantry_index.invalidate()
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def create_tags(self, count):
+        return self.bulk_create(Tag, [
+            Tag(name=f'{self.prefix} {number}', slug=f'{self.prefix}-{number}')
+            for number in range(count)
+        ])
+
+    def create_ingredients(self, count):
+        return self.bulk_create(Ingredient, [
+            Ingredient(
+                name=f'{self.prefix} {self.random.choice(WORDS)} {number}',
+                measurement_unit=self.random.choice(UNITS),
+            )
+            for number in range(count)
+        ])
+
+    def create_users(self, count, password):
+        password = make_password(password)
+        return self.bulk_create(User, [
+            User(
+                email=f'{self.prefix}_{number}@example.com',
+                username=f'{self.prefix}_{number}',
+                first_name=self.random.choice(WORDS).capitalize(),
+                last_name=f'{self.prefix.capitalize()} {number}',
+                password=password,
+            )
+            for number in range(count)
+        ])
+
+    def placeholder_image(self):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 480), (230, 200, 160)).save(
+                buffer, 'JPEG'
+            )
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return IMAGE_NAME
+
+    def create_recipes(self, count, users):
+        image = self.placeholder_image()
+        recipes = self.bulk_create(Recipe, [
+            Recipe(
+                author=self.random.choice(users),
+                name=' '.join(self.random.sample(WORDS, 3)).capitalize(),
+                text=' '.join(self.random.choices(WORDS, k=30)),
+                cooking_time=self.random.randint(5, 180),
+                image=image,
+            )
+            for _ in range(count)
+        ])
+        for recipe in recipes:
+            recipe.pub_date = PUB_DATE_EPOCH - timedelta(
+                seconds=self.random.randint(
+                    0, PUB_DATE_SPREAD_DAYS * 24 * 60 * 60
+                )
+            )
+        Recipe.objects.bulk_update(
+            recipes, ['pub_date'], batch_size=self.batch_size
+        )
+        return recipes
+
+    def sample(self, population, count, exclude=None):
+        count = min(count, len(population))
+        chosen = self.random.sample(population, count)
+        return [item for item in chosen if item.pk != exclude]
+
+    def create_recipe_relations(self, recipes, tags, ingredients, maximum):
+        RecipeTag = Recipe.tags.through
+        self.bulk_create(RecipeTag, [
+            RecipeTag(recipe_id=recipe.pk, tag_id=tag.pk)
+            for recipe in recipes
+            for tag in self.sample(tags, self.random.randint(1, 3))
+        ])
+        self.bulk_create(RecipeIngredient, [
+            RecipeIngredient(
+                recipe_id=recipe.pk,
+                ingredient_id=ingredient.pk,
+                amount=self.random.randint(1, 500),
+            )
+            for recipe in recipes
+            for ingredient in self.sample(
+                ingredients, self.random.randint(1, maximum)
+            )
+        ])
+
+    def create_user_relations(self, model, field, users, targets, count):
+        self.bulk_create(model, [
+            model(user_id=user.pk, **{field: target.pk})
+            for user in users
+            for target in self.sample(
+                targets,
+                count,
+                exclude=user.pk if model is Follow else None,
+            )
+        ])
@@ -0,0 +1,51 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.transfer import RecipeImporter
+
+
+class Command(BaseCommand):
+    help = 'Загружает рецепты со связанными данными из NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для загрузки, по умолчанию стандартный ввод',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Число записей в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        from_stdin = options['path'] == '-'
+        source = (
+            sys.stdin if from_stdin
+            else open(options['path'], encoding='utf-8')
+        )
+        importer = RecipeImporter(batch_size=options['batch_size'])
+        lines = 0
+        try:
+            for lines, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as error:
+                    raise CommandError(f'Строка {lines}: {error}')
+                if importer.add(record):
+                    self.report(importer.stats, lines)
+        finally:
+            if not from_stdin:
+                source.close()
+        stats = importer.finish()
+        self.report(stats, lines)
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
+
+    def report(self, stats, lines):
+        self.stdout.write(
+            f'Строк: {lines}, рецептов создано: {stats["created"]}, '
+            f'обновлено: {stats["updated"]}, пропущено: {stats["skipped"]}, '
+            f'изображений: {stats["images"]}'
+        )
@@ -1,28 +1,182 @@
+import csv
 import json
 import os
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from recipes.catalogs import ingredient_catalog
+from recipes.constants import (INGREDIENT_NAME_MAX_LENGTH,
+                               INGREDIENT_UNIT_MAX_LENGTH)
 from recipes.models import Ingredient
 
+FORMATS = ('json', 'csv', 'ndjson')
+READ_SIZE = 64 * 1024
+
+
+def read_json(source):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = source.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if not chunk:
+                    raise CommandError('Некорректный JSON')
+                break
+            yield item
+        if not chunk:
+            raise CommandError('Некорректный JSON')
+
+
+def read_ndjson(source):
+    for number, line in enumerate(source, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise CommandError(f'Некорректный JSON в строке {number}')
+
+
+def read_csv(source):
+    for number, row in enumerate(csv.reader(source)):
+        if number == 0 and [value.strip() for value in row] == [
+            'name', 'measurement_unit'
+        ]:
+            continue
+        yield dict(zip(('name', 'measurement_unit'), row))
+
+
+READERS = {'json': read_json, 'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def parse_item(item):
+    if not isinstance(item, dict):
+        return None
+    name = str(item.get('name') or '').strip()
+    unit = str(item.get('measurement_unit') or '').strip()
+    if (
+        not name or not unit
+        or len(name) > INGREDIENT_NAME_MAX_LENGTH
+        or len(unit) > INGREDIENT_UNIT_MAX_LENGTH
+    ):
+        return None
+    return name, unit
+
 
 class Command(BaseCommand):
-    help = 'Импортирует ингредиенты из JSON-файла в модель Ingredient'
+    help = 'Импортирует ингредиенты из JSON, CSV или NDJSON'
 
-    def handle(self, *args, **kwargs):
-        file_path = os.path.join(settings.BASE_DIR, 'data', 'ingredients.json')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(
+                settings.BASE_DIR, 'data', 'ingredients.json'
+            ),
+            help='Путь к файлу с ингредиентами',
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS, dest='file_format',
+            help='Формат файла, по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Число ингредиентов в одной пачке',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Показать изменения, не записывая их в базу',
+        )
 
-        ingredients = [
-            Ingredient(
-                name=item['name'], measurement_unit=item['measurement_unit']
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = (
+            options['file_format']
+            or os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {file_format}')
+        self.dry_run = options['dry_run']
+        self.counts = dict.fromkeys(
+            ('inserted', 'existing', 'duplicates', 'invalid'), 0
+        )
+        self.seen = set()
+        try:
+            source = open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+        batch = []
+        with source:
+            for item in READERS[file_format](source):
+                key = parse_item(item)
+                if key is None:
+                    self.counts['invalid'] += 1
+                    continue
+                if key in self.seen:
+                    self.counts['duplicates'] += 1
+                    continue
+                self.seen.add(key)
+                batch.append(key)
+                if len(batch) >= options['batch_size']:
+                    self.load_batch(batch)
+                    batch = []
+        self.load_batch(batch)
+        if self.counts['inserted'] and not self.dry_run:
+            ingredient_catalog.invalidate()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{"Будет добавлено" if self.dry_run else "Добавлено"}: '
+                f'{self.counts["inserted"]}, '
+                f'уже в базе: {self.counts["existing"]}, '
+                f'повторов в файле: {self.counts["duplicates"]}, '
+                f'некорректных записей: {self.counts["invalid"]}'
             )
-            for item in data
-        ]
+        )
 
-        Ingredient.objects.bulk_create(ingredients, ignore_conflicts=True)
+    def existing_keys(self, batch):
+        return set(batch) & set(
+            Ingredient.objects.filter(
+                name__in={name for name, _ in batch}
+            ).values_list('name', 'measurement_unit')
+        )
 
-        self.stdout.write(
-            self.style.SUCCESS(f'Загружено {len(ingredients)} ингредиентов')
+    def load_batch(self, batch):
+        if not batch:
+            return
+        existing = self.existing_keys(batch)
+        new = [key for key in batch if key not in existing]
+        self.counts['existing'] += len(existing)
+        if self.dry_run:
+            self.counts['inserted'] += len(new)
+            for name, unit in new:
+                self.stdout.write(f'+ {name}, {unit}')
+            return
+        if not new:
+            return
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in new
+            ],
+            ignore_conflicts=True,
         )
+        inserted = len(self.existing_keys(batch)) - len(existing)
+        self.counts['inserted'] += inserted
+        self.counts['existing'] += len(new) - inserted
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+from recipes.shopping_list import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сводные списки покупок из корзин пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, nargs='+', dest='user_ids',
+            help='Пересобрать списки только для указанных пользователей',
+        )
+
+    def handle(self, *args, **options):
+        with atomic():
+            created = rebuild(options['user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Записано {created} позиций списков покупок')
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic
+from recipes.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики рецептов и пользователей с фактическими данными'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, не исправляя их',
+        )
+
+    def handle(self, *args, **options):
+        fix = not options['dry_run']
+        with atomic():
+            results = reconcile(fix=fix)
+        total = 0
+        for model, field, changed in results:
+            total += changed
+            self.stdout.write(
+                f'{model._meta.label}.{field}: '
+                f'{"исправлено" if fix else "расхождений"} {changed}'
+            )
+        if total and not fix:
+            raise CommandError(f'Найдено {total} расхождений')
+        self.stdout.write(self.style.SUCCESS('Счётчики согласованы'))
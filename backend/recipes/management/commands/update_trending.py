@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+from recipes.trending import compute_scores, store_scores
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг популярности рецептов с учётом давности'
+
+    def handle(self, *args, **options):
+        scores = compute_scores()
+        with atomic():
+            updated, reset = store_scores(scores)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Обновлено рецептов: {updated}, обнулено: {reset}'
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_alter_ingredient_measurement_unit_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model("recipes", "ShoppingCart")
+    ShoppingListItem = apps.get_model("recipes", "ShoppingListItem")
+    totals = (
+        ShoppingCart.objects.filter(recipe__ingredients__isnull=False)
+        .values_list("user_id", "recipe__ingredients__ingredient_id")
+        .annotate(total=Sum("recipe__ingredients__amount"))
+        .order_by()
+    )
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total
+            )
+            for user_id, ingredient_id, total in totals
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_recipe_image_variants"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingListItem",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("amount", models.IntegerField(default=0)),
+                ("ingredient", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="recipes.ingredient")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="shopping_list", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "unique_together": {("user", "ingredient")},
+            },
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:13
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_shoppinglistitem"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="recipe",
+            options={"ordering": ["-pub_date", "-id"]},
+        ),
+    ]
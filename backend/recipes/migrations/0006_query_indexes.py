@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+POSTGRES_INDEXES = [
+    (
+        "recipes_ingredient_name_upper_idx",
+        "CREATE INDEX IF NOT EXISTS recipes_ingredient_name_upper_idx "
+        "ON recipes_ingredient (UPPER(name) text_pattern_ops)",
+    ),
+    (
+        "recipes_recipe_tags_tag_recipe_idx",
+        "CREATE INDEX IF NOT EXISTS recipes_recipe_tags_tag_recipe_idx "
+        "ON recipes_recipe_tags (tag_id, recipe_id)",
+    ),
+]
+
+
+def create_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, sql in POSTGRES_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in POSTGRES_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_alter_recipe_options"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-pub_date", "-id"], name="recipe_pub_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["author", "-pub_date"], name="recipe_author_pub_date_idx"),
+        ),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
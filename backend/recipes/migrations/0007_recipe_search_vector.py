@@ -0,0 +1,76 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:16
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce({row}.name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce({row}.text, '')), 'B')"
+)
+
+
+def create_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION recipes_recipe_search_vector_update() "
+        "RETURNS trigger AS $$ BEGIN "
+        f"NEW.search_vector := {SEARCH_VECTOR.format(row='NEW')}; "
+        "RETURN NEW; END $$ LANGUAGE plpgsql"
+    )
+    schema_editor.execute(
+        "CREATE TRIGGER recipes_recipe_search_vector_trigger "
+        "BEFORE INSERT OR UPDATE ON recipes_recipe FOR EACH ROW "
+        "EXECUTE FUNCTION recipes_recipe_search_vector_update()"
+    )
+    schema_editor.execute(
+        "UPDATE recipes_recipe SET search_vector = "
+        + SEARCH_VECTOR.format(row="recipes_recipe")
+    )
+    schema_editor.execute(
+        "CREATE INDEX recipes_recipe_search_vector_idx "
+        "ON recipes_recipe USING GIN (search_vector)"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX recipes_recipe_name_trgm_idx "
+        "ON recipes_recipe USING GIN (name gin_trgm_ops)"
+    )
+
+
+def drop_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS recipes_recipe_name_trgm_idx")
+    schema_editor.execute(
+        "DROP INDEX IF EXISTS recipes_recipe_search_vector_idx"
+    )
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger "
+        "ON recipes_recipe"
+    )
+    schema_editor.execute(
+        "DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update()"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_objects, drop_search_objects),
+    ]
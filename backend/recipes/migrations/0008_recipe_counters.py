@@ -0,0 +1,80 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_related(model, relation):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{relation: OuterRef("pk")})
+            .order_by()
+            .values(relation)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Recipe.objects.update(
+        favorites_count=count_related(
+            apps.get_model("recipes", "Favorite"), "recipe"
+        ),
+        carts_count=count_related(
+            apps.get_model("recipes", "ShoppingCart"), "recipe"
+        ),
+    )
+
+
+def limit_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger "
+        "ON recipes_recipe"
+    )
+    schema_editor.execute(
+        "CREATE TRIGGER recipes_recipe_search_vector_trigger "
+        "BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe "
+        "FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector_update()"
+    )
+
+
+def restore_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger "
+        "ON recipes_recipe"
+    )
+    schema_editor.execute(
+        "CREATE TRIGGER recipes_recipe_search_vector_trigger "
+        "BEFORE INSERT OR UPDATE ON recipes_recipe FOR EACH ROW "
+        "EXECUTE FUNCTION recipes_recipe_search_vector_update()"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="carts_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Добавлений в корзину"),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Добавлений в избранное"),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.RunPython(limit_search_trigger, restore_search_trigger),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:24
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_recipe_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="favorite",
+            name="created",
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="trending_score",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="shoppingcart",
+            name="created",
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-favorites_count", "-pub_date", "-id"], name="recipe_popular_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-trending_score", "-pub_date", "-id"], name="recipe_trending_idx"),
+        ),
+    ]
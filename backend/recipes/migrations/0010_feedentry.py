@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_recipe_trending"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("pub_date", models.DateTimeField()),
+                ("recipe", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="feed_entries", to="recipes.recipe")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="feed_entries", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["user", "-pub_date", "-recipe"], name="feed_entry_user_pub_date_idx")],
+                "unique_together": {("user", "recipe")},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0010_feedentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShortLink",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("code", models.CharField(max_length=16, unique=True)),
+                ("clicks", models.PositiveBigIntegerField(default=0, editable=False, verbose_name="Переходов")),
+                ("recipe", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="short_link", to="recipes.recipe")),
+            ],
+        ),
+    ]
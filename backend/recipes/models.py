@@ -1,9 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch
+
+from users.models import Follow
 
 from .constants import (INGREDIENT_NAME_MAX_LENGTH, INGREDIENT_UNIT_MAX_LENGTH,
-                        MIN_VALUE, RECIPE_NAME_MAX_LENGTH, TAG_NAME_MAX_LENGTH,
+                        MIN_VALUE, RECIPE_NAME_MAX_LENGTH,
+                        SHORT_LINK_CODE_MAX_LENGTH, TAG_NAME_MAX_LENGTH,
                         TAG_SLUG_MAX_LENGTH)
 
 User = get_user_model()
@@ -32,6 +37,42 @@ class Ingredient(models.Model):
         return f"{self.name}, {self.measurement_unit}"
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self, user):
+        authors = User.objects.all()
+        if user.is_authenticated:
+            authors = authors.annotate(
+                is_subscribed=Exists(
+                    Follow.objects.filter(user=user, author=OuterRef("pk"))
+                )
+            )
+        return self.prefetch_related(
+            Prefetch("author", queryset=authors),
+            "tags",
+            Prefetch(
+                "ingredients",
+                queryset=RecipeIngredient.objects.select_related("ingredient"),
+            ),
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().defer("search_vector")
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -40,15 +81,44 @@ class Recipe(models.Model):
     )
     name = models.CharField(max_length=RECIPE_NAME_MAX_LENGTH)
     image = models.ImageField(upload_to="recipes/images/")
+    image_variants = models.JSONField(default=dict, blank=True)
     text = models.TextField()
     cooking_time = models.PositiveIntegerField(
         validators=[MinValueValidator(MIN_VALUE)]
     )
     tags = models.ManyToManyField(Tag, related_name="recipes")
     pub_date = models.DateTimeField(auto_now_add=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    favorites_count = models.PositiveIntegerField(
+        "Добавлений в избранное", default=0, editable=False
+    )
+    carts_count = models.PositiveIntegerField(
+        "Добавлений в корзину", default=0, editable=False
+    )
+    trending_score = models.FloatField(default=0, editable=False)
+
+    objects = RecipeManager()
 
     class Meta:
-        ordering = ["-pub_date"]
+        ordering = ["-pub_date", "-id"]
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="recipe_pub_date_id_idx",
+            ),
+            models.Index(
+                fields=["author", "-pub_date"],
+                name="recipe_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=["-favorites_count", "-pub_date", "-id"],
+                name="recipe_popular_idx",
+            ),
+            models.Index(
+                fields=["-trending_score", "-pub_date", "-id"],
+                name="recipe_trending_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -81,6 +151,7 @@ class UserRecipeBase(models.Model):
         Recipe,
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         abstract = True
@@ -111,3 +182,57 @@ class ShoppingCart(UserRecipeBase):
         on_delete=models.CASCADE,
         related_name="in_cart",
     )
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+    )
+    amount = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ["user", "ingredient"]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ["user", "recipe"]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-recipe"],
+                name="feed_entry_user_pub_date_idx",
+            ),
+        ]
+
+
+class ShortLink(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="short_link",
+    )
+    code = models.CharField(max_length=SHORT_LINK_CODE_MAX_LENGTH, unique=True)
+    clicks = models.PositiveBigIntegerField(
+        "Переходов", default=0, editable=False
+    )
+
+    def __str__(self):
+        return self.code
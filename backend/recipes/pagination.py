@@ -1,5 +1,186 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (LimitOffsetPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .constants import RECIPE_ORDERINGS
 
 
 class AnyPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        paginator = self.django_paginator_class(
+            queryset, self.get_page_size(request)
+        )
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as error:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(error)
+            ))
+        self.page.object_list = [
+            item async for item in self.page.object_list
+        ]
+        return self.page.object_list
+
+
+class AsyncLimitOffsetPagination(LimitOffsetPagination):
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [
+            item async for item in
+            queryset[self.offset:self.offset + self.limit]
+        ]
+
+
+class RecipePagination(AnyPageNumberPagination):
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор'
+    cursor_types = {'pub_date': datetime, 'trending_score': float}
+
+    def use_keyset(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def get_ordering(self, request):
+        return RECIPE_ORDERINGS.get(
+            request.query_params.get(self.ordering_query_param),
+            self.ordering,
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        return self.get_keyset_page(
+            list(self.get_keyset_queryset(queryset, request))
+        )
+
+    async def apaginate_queryset(self, queryset, request):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return await super().apaginate_queryset(queryset, request)
+        return self.get_keyset_page([
+            item async for item in self.get_keyset_queryset(queryset, request)
+        ])
+
+    def get_keyset_queryset(self, queryset, request):
+        self.request = request
+        self.keyset_ordering = self.get_ordering(request)
+        self.fields = [field.lstrip('-') for field in self.keyset_ordering]
+        self.keyset_page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        queryset = queryset.order_by(*self.keyset_ordering)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode(cursor)))
+        return queryset[:self.keyset_page_size + 1]
+
+    def get_keyset_page(self, page):
+        page_size = self.keyset_page_size
+        self.next_values = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_values = [
+                getattr(page[-1], field) for field in self.fields
+            ]
+        return page
+
+    def after(self, values):
+        condition = Q()
+        for position, field in enumerate(self.keyset_ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            name = self.fields[position]
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            for previous, value in zip(self.fields[:position], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def encode(self, values):
+        data = json.dumps([
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ])
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                self.parse(field, value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def parse(self, field, value):
+        kind = self.cursor_types.get(field, int)
+        if isinstance(value, bool):
+            raise TypeError(value)
+        if kind is datetime:
+            if not isinstance(value, str):
+                raise TypeError(value)
+            return datetime.fromisoformat(value)
+        if kind is float:
+            if not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(value)
+            return float(value)
+        if not isinstance(value, int):
+            raise TypeError(value)
+        return value
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_values is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode(self.next_values)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(RecipePagination):
+    def use_keyset(self, request):
+        return True
+
+    def get_ordering(self, request):
+        return self.ordering
+
+
+class TimelinePagination(FeedPagination):
+    ordering = ('-pub_date', '-recipe_id')
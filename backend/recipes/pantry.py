@@ -0,0 +1,87 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from .cache import VersionedIndex
+from .constants import PANTRY_LOAD_CHUNK_SIZE
+from .models import RecipeIngredient
+
+PANTRY_VERSION = "recipes-pantry"
+
+
+class PantryIndex(VersionedIndex):
+    def __init__(self, name):
+        super().__init__(name)
+        self._postings = {}
+        self._recipes = {}
+
+    def _rebuild(self):
+        postings = {}
+        recipes = {}
+        rows = (
+            RecipeIngredient.objects.order_by("ingredient_id", "recipe_id")
+            .values_list("ingredient_id", "recipe_id")
+            .iterator(chunk_size=PANTRY_LOAD_CHUNK_SIZE)
+        )
+        for ingredient_id, recipe_id in rows:
+            if ingredient_id not in postings:
+                postings[ingredient_id] = array("q")
+            postings[ingredient_id].append(recipe_id)
+            recipes.setdefault(recipe_id, []).append(ingredient_id)
+        self._postings = postings
+        self._recipes = {
+            pk: tuple(ingredient_ids)
+            for pk, ingredient_ids in recipes.items()
+        }
+
+    def _refresh(self, pks):
+        recipes = {pk: [] for pk in pks}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=pks
+        ).values_list("recipe_id", "ingredient_id"):
+            recipes[recipe_id].append(ingredient_id)
+        for pk, ingredient_ids in recipes.items():
+            self._remove(pk)
+            self._add(pk, ingredient_ids)
+
+    def _add(self, pk, ingredient_ids):
+        ingredient_ids = tuple(set(ingredient_ids))
+        for ingredient_id in ingredient_ids:
+            if ingredient_id not in self._postings:
+                self._postings[ingredient_id] = array("q")
+            insort(self._postings[ingredient_id], pk)
+        if ingredient_ids:
+            self._recipes[pk] = ingredient_ids
+
+    def _remove(self, pk):
+        for ingredient_id in self._recipes.pop(pk, ()):
+            recipe_ids = self._postings.get(ingredient_id)
+            if recipe_ids is None:
+                continue
+            position = bisect_left(recipe_ids, pk)
+            if position < len(recipe_ids) and recipe_ids[position] == pk:
+                del recipe_ids[position]
+            if not recipe_ids:
+                del self._postings[ingredient_id]
+
+    def match(self, ingredient_ids, max_missing=None):
+        counts = Counter()
+        with self._lock:
+            self._load()
+            for ingredient_id in set(ingredient_ids):
+                recipe_ids = self._postings.get(ingredient_id)
+                if recipe_ids is not None:
+                    counts.update(recipe_ids)
+            totals = {pk: len(self._recipes[pk]) for pk in counts}
+        matches = [
+            (pk, matched, totals[pk])
+            for pk, matched in counts.items()
+            if max_missing is None or totals[pk] - matched <= max_missing
+        ]
+        matches.sort(
+            key=lambda item: (-item[1] / item[2], item[2] - item[1], -item[0])
+        )
+        return matches
+
+
+pantry_index = PantryIndex(PANTRY_VERSION)
@@ -0,0 +1,158 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .cache import VersionedIndex
+from .constants import (SEARCH_CONFIG, SEARCH_RESULTS_LIMIT,
+                        SEARCH_TRIGRAM_THRESHOLD)
+from .models import Recipe
+
+SEARCH_VERSION = "recipes-search"
+NAME_WEIGHT = 2
+TEXT_WEIGHT = 1
+WORD = re.compile(r"\w+")
+
+
+def tokenize(value):
+    return WORD.findall(value.lower())
+
+
+class RecipeSearchIndex(VersionedIndex):
+    def __init__(self, name):
+        super().__init__(name)
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._terms = []
+
+    def _rebuild(self):
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        for pk, name, text in Recipe.objects.values_list(
+            "id", "name", "text"
+        ).iterator():
+            self._add(pk, name, text)
+        self._terms = sorted(self._postings)
+
+    def _refresh(self, pks):
+        for pk in pks:
+            self._remove(pk)
+        for pk, name, text in Recipe.objects.filter(id__in=pks).values_list(
+            "id", "name", "text"
+        ):
+            self._add(pk, name, text)
+        self._terms = sorted(self._postings)
+
+    def _add(self, pk, name, text):
+        weights = defaultdict(int)
+        for term in tokenize(name):
+            weights[term] += NAME_WEIGHT
+        for term in tokenize(text):
+            weights[term] += TEXT_WEIGHT
+        for term, weight in weights.items():
+            self._postings[term][pk] = weight
+        self._documents[pk] = tuple(weights)
+
+    def _remove(self, pk):
+        for term in self._documents.pop(pk, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(pk, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _matches(self, term):
+        scores = defaultdict(int)
+        position = bisect_left(self._terms, term)
+        while (
+            position < len(self._terms)
+            and self._terms[position].startswith(term)
+        ):
+            for pk, weight in self._postings[self._terms[position]].items():
+                scores[pk] = max(scores[pk], weight)
+            position += 1
+        return scores
+
+    def search(self, query, limit=SEARCH_RESULTS_LIMIT):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            self._load()
+            scores = None
+            for term in sorted(set(terms), key=len, reverse=True):
+                matches = self._matches(term)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {
+                        pk: score + matches[pk]
+                        for pk, score in scores.items()
+                        if pk in matches
+                    }
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [pk for pk, _ in ranked[:limit]]
+
+
+search_index = RecipeSearchIndex(SEARCH_VERSION)
+_trigram_available = None
+
+
+def trigram_available():
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _trigram_available = cursor.fetchone() is not None
+    return _trigram_available
+
+
+def _postgres_search(queryset, query):
+    search_query = SearchQuery(
+        query, config=SEARCH_CONFIG, search_type="websearch"
+    )
+    matches = queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F("search_vector"), search_query)
+    )
+    if not trigram_available() or matches.exists():
+        return matches.order_by("-rank", "-pub_date", "-id")
+    return (
+        queryset.filter(name__trigram_word_similar=query)
+        .annotate(rank=TrigramWordSimilarity(query, "name"))
+        .filter(rank__gte=SEARCH_TRIGRAM_THRESHOLD)
+        .order_by("-rank", "-pub_date", "-id")
+    )
+
+
+def _index_search(queryset, query):
+    ids = search_index.search(query)
+    if not ids:
+        return queryset.none()
+    return (
+        queryset.filter(id__in=ids)
+        .annotate(
+            rank=Case(
+                *[
+                    When(id=pk, then=Value(len(ids) - position))
+                    for position, pk in enumerate(ids)
+                ],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("-rank", "-pub_date", "-id")
+    )
+
+
+def search_recipes(queryset, query):
+    if connection.vendor == "postgresql":
+        return _postgres_search(queryset, query)
+    return _index_search(queryset, query)
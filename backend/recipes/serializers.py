@@ -1,10 +1,21 @@
+from functools import partial
+
+from django.db import transaction
 from django.db.transaction import atomic
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 
 from users.serializers import AnyUserSerializer
+
+from . import feed
+from .constants import MIN_VALUE
+from .counters import change_counter
+from .fields import ImageVariantsField
+from .images import schedule_variants
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     ShoppingCart, Tag, User)
+from .pantry import pantry_index
+from .shopping_list import change_recipe
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -20,9 +31,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class IngredientInRecipeReadSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.ReadOnlyField(source="ingredient_id")
     name = serializers.ReadOnlyField(source="ingredient.name")
     measurement_unit = serializers.ReadOnlyField(
         source="ingredient.measurement_unit"
@@ -34,11 +43,12 @@ class IngredientInRecipeReadSerializer(serializers.ModelSerializer):
 
 
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = serializers.ImageField(read_only=True)
+    image_variants = ImageVariantsField("image", "image_variants")
 
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
 
 
 class RecipeReadSerializer(serializers.ModelSerializer):
@@ -51,7 +61,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = serializers.ImageField(read_only=True)
+    image_variants = ImageVariantsField("image", "image_variants")
 
     class Meta:
         model = Recipe
@@ -64,34 +75,54 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
 
-    def get_is_favorited(self, obj):
+    def _get_flag(self, obj, name, model):
+        if hasattr(obj, name):
+            return getattr(obj, name)
         request = self.context.get("request")
-        return (
+        return bool(
             request
             and request.user.is_authenticated
-            and Favorite.objects.filter(user=request.user, recipe=obj).exists()
+            and model.objects.filter(user=request.user, recipe=obj).exists()
         )
 
+    def get_is_favorited(self, obj):
+        return self._get_flag(obj, "is_favorited", Favorite)
+
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get("request")
-        return (
-            request
-            and request.user.is_authenticated
-            and ShoppingCart.objects.filter(
-                user=request.user, recipe=obj
-            ).exists()
+        return self._get_flag(obj, "is_in_shopping_cart", ShoppingCart)
+
+
+class CookableRecipeSerializer(RecipeReadSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + (
+            "coverage",
+            "missing_count",
         )
 
 
-class RecipeWriteSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
+class CookableQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
     )
-    ingredients = IngredientInRecipeReadSerializer(many=True)
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
+class IngredientInRecipeWriteSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=MIN_VALUE)
+
+
+class RecipeWriteSerializer(serializers.ModelSerializer):
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = IngredientInRecipeWriteSerializer(many=True)
     image = Base64ImageField()
 
     class Meta:
@@ -111,33 +142,80 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Поле image обязательно")
         return value
 
+    def _missing(self, model, ids):
+        found = set(
+            model.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+        return sorted(set(ids) - found)
+
     def validate(self, data):
         if not data.get("ingredients"):
             raise serializers.ValidationError("Требуются ингредиенты")
 
-        ingredient_ids = [item["id"].id for item in data["ingredients"]]
+        ingredient_ids = [item["id"] for item in data["ingredients"]]
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise serializers.ValidationError("Дублирующиеся ингредиенты")
+        missing = self._missing(Ingredient, ingredient_ids)
+        if missing:
+            raise serializers.ValidationError(
+                f"Ингредиенты не найдены: {', '.join(map(str, missing))}"
+            )
 
         if not data.get("tags"):
             raise serializers.ValidationError("Требуются теги")
 
-        tags = [tag.id for tag in data["tags"]]
+        tags = data["tags"]
         if len(tags) != len(set(tags)):
             raise serializers.ValidationError("Дублирующиеся теги")
+        missing = self._missing(Tag, tags)
+        if missing:
+            raise serializers.ValidationError(
+                f"Теги не найдены: {', '.join(map(str, missing))}"
+            )
 
+        data["ingredients"] = {
+            item["id"]: item["amount"] for item in data["ingredients"]
+        }
         return data
 
-    def add_ingredients(self, recipe, ingredients_data):
-        ingredients = [
-            RecipeIngredient(
-                recipe=recipe,
-                ingredient=item["id"],
-                amount=item["amount"]
+    def sync_ingredients(self, recipe, amounts):
+        current = {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in recipe.ingredients.values_list(
+                "id", "ingredient_id", "amount"
             )
-            for item in ingredients_data
+        }
+        stale = [
+            pk
+            for ingredient_id, (pk, _) in current.items()
+            if ingredient_id not in amounts
         ]
-        RecipeIngredient.objects.bulk_create(ingredients)
+        if stale:
+            RecipeIngredient.objects.filter(id__in=stale).delete()
+        RecipeIngredient.objects.bulk_update(
+            [
+                RecipeIngredient(id=current[ingredient_id][0], amount=amount)
+                for ingredient_id, amount in amounts.items()
+                if ingredient_id in current
+                and current[ingredient_id][1] != amount
+            ],
+            ["amount"],
+        )
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                )
+                for ingredient_id, amount in amounts.items()
+                if ingredient_id not in current
+            ]
+        )
+        if current.keys() != amounts.keys():
+            transaction.on_commit(partial(pantry_index.update, recipe.pk))
+        return {
+            ingredient_id: amount
+            for ingredient_id, (_, amount) in current.items()
+        }
 
     @atomic
     def create(self, validated_data):
@@ -148,7 +226,10 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             **validated_data,
         )
         recipe.tags.set(tags)
-        self.add_ingredients(recipe, ingredients)
+        self.sync_ingredients(recipe, ingredients)
+        change_counter(User, recipe.author_id, "recipes_count", 1)
+        feed.add_recipe(recipe)
+        schedule_variants(recipe, "image", "image_variants")
         return recipe
 
     @atomic
@@ -156,9 +237,24 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
         instance.tags.set(tags)
-        instance.ingredients.all().delete()
-        self.add_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        old_amounts = self.sync_ingredients(instance, ingredients)
+        change_recipe(instance, old_amounts, ingredients)
+        stale = None
+        if "image" in validated_data:
+            stale = instance.image_variants
+            validated_data["image_variants"] = {}
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=list(validated_data))
+        if stale is not None:
+            schedule_variants(instance, "image", "image_variants", stale)
+        return instance
 
     def to_representation(self, instance):
+        user = self.context["request"].user
+        instance = (
+            Recipe.objects.with_user_flags(user)
+            .with_related(user)
+            .get(pk=instance.pk)
+        )
         return RecipeReadSerializer(instance, context=self.context).data
@@ -0,0 +1,133 @@
+from django.db.models import Case, F, Sum, Value, When
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def recipe_amounts(recipe):
+    return dict(
+        RecipeIngredient.objects.filter(recipe=recipe).values_list(
+            "ingredient_id", "amount"
+        )
+    )
+
+
+def cart_user_ids(recipe):
+    return list(
+        ShoppingCart.objects.filter(recipe=recipe).values_list(
+            "user_id", flat=True
+        )
+    )
+
+
+def apply_deltas(user_ids, deltas):
+    deltas = {
+        ingredient_id: amount
+        for ingredient_id, amount in deltas.items()
+        if amount
+    }
+    if not user_ids or not deltas:
+        return
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+            for user_id in user_ids
+            for ingredient_id, amount in deltas.items()
+            if amount > 0
+        ],
+        ignore_conflicts=True,
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    items.update(
+        amount=F("amount") + Case(
+            *[
+                When(ingredient_id=ingredient_id, then=Value(amount))
+                for ingredient_id, amount in deltas.items()
+            ],
+            default=Value(0),
+        )
+    )
+    items.filter(amount__lte=0).delete()
+
+
+def add_recipe(user, recipe):
+    apply_deltas([user.id], recipe_amounts(recipe))
+
+
+def remove_recipe(user, recipe):
+    apply_deltas(
+        [user.id],
+        {key: -value for key, value in recipe_amounts(recipe).items()},
+    )
+
+
+def change_recipe(recipe, old_amounts, new_amounts):
+    deltas = {
+        ingredient_id: (
+            new_amounts.get(ingredient_id, 0)
+            - old_amounts.get(ingredient_id, 0)
+        )
+        for ingredient_id in old_amounts.keys() | new_amounts.keys()
+    }
+    if any(deltas.values()):
+        apply_deltas(cart_user_ids(recipe), deltas)
+
+
+def drop_recipe(recipe):
+    apply_deltas(
+        cart_user_ids(recipe),
+        {key: -value for key, value in recipe_amounts(recipe).items()},
+    )
+
+
+def expected_totals(user_ids=None):
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+    return (
+        carts.filter(recipe__ingredients__isnull=False)
+        .values_list("user_id", "recipe__ingredients__ingredient_id")
+        .annotate(total=Sum("recipe__ingredients__amount"))
+        .order_by()
+    )
+
+
+def rebuild(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    created = ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total
+            )
+            for user_id, ingredient_id, total in expected_totals(user_ids)
+        ),
+        batch_size=1000,
+    )
+    return len(created)
+
+
+def find_mismatches(user_ids=None):
+    expected = {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in expected_totals(user_ids)
+    }
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    actual = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in items.values_list(
+            "user_id", "ingredient_id", "amount"
+        )
+    }
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        expected_amount = expected.get(key, 0)
+        actual_amount = actual.get(key, 0)
+        if expected_amount != actual_amount:
+            mismatches.append((*key, expected_amount, actual_amount))
+    return sorted(mismatches)
@@ -0,0 +1,181 @@
+import atexit
+import logging
+import os
+import secrets
+import string
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Case, F, Value, When
+
+from .constants import (SHORT_LINK_CACHE_TIMEOUT,
+                        SHORT_LINK_CLICKS_FLUSH_INTERVAL,
+                        SHORT_LINK_CLICKS_FLUSH_SIZE, SHORT_LINK_CODE_ATTEMPTS,
+                        SHORT_LINK_CODE_LENGTH, SHORT_LINK_CODE_MAX_LENGTH,
+                        SHORT_LINK_LOCAL_CACHE_SIZE,
+                        SHORT_LINK_LOCAL_CACHE_TIMEOUT)
+from .models import ShortLink
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = string.digits + string.ascii_letters
+SHORT_LINK_KEY = "short-link:{}"
+
+
+def generate_code(length=SHORT_LINK_CODE_LENGTH):
+    return "".join(secrets.choice(ALPHABET) for _ in range(length))
+
+
+def is_valid_code(code):
+    return 0 < len(code) <= SHORT_LINK_CODE_MAX_LENGTH and all(
+        char in ALPHABET for char in code
+    )
+
+
+def get_short_link(recipe):
+    link = ShortLink.objects.filter(recipe=recipe).first()
+    if link is not None:
+        return link
+    for attempt in range(SHORT_LINK_CODE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return ShortLink.objects.create(
+                    recipe=recipe, code=generate_code()
+                )
+        except IntegrityError:
+            link = ShortLink.objects.filter(recipe=recipe).first()
+            if link is not None:
+                return link
+            if attempt == SHORT_LINK_CODE_ATTEMPTS - 1:
+                raise
+
+
+class ShortLinkResolver:
+    def __init__(self, size, timeout, shared_timeout):
+        self.size = size
+        self.timeout = timeout
+        self.shared_timeout = shared_timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def resolve(self, code):
+        if not is_valid_code(code):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(code)
+                return entry[1]
+        key = SHORT_LINK_KEY.format(code)
+        target = cache.get(key)
+        if target is None:
+            target = (
+                ShortLink.objects.filter(code=code)
+                .values_list("id", "recipe_id")
+                .first()
+            )
+            if target is None:
+                return None
+            cache.set(key, target, self.shared_timeout)
+        with self._lock:
+            self._entries[code] = (now + self.timeout, target)
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return target
+
+    def forget(self, code):
+        with self._lock:
+            self._entries.pop(code, None)
+        cache.delete(SHORT_LINK_KEY.format(code))
+
+
+class ClickCounter:
+    def __init__(self, flush_size, flush_interval):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._clicks = Counter()
+        self._pending = 0
+        self._timer_pid = None
+
+    def add(self, link_id):
+        with self._lock:
+            self._start_timer()
+            self._clicks[link_id] += 1
+            self._pending += 1
+            if self._pending < self.flush_size:
+                return
+            clicks = self._take()
+        self._write(clicks)
+
+    def flush(self):
+        with self._lock:
+            clicks = self._take()
+        self._write(clicks)
+
+    def _start_timer(self):
+        if self._timer_pid == os.getpid():
+            return
+        self._timer_pid = os.getpid()
+        self._schedule()
+
+    def _schedule(self):
+        timer = threading.Timer(self.flush_interval, self._run)
+        timer.name = "short-link-clicks"
+        timer.daemon = True
+        timer.start()
+
+    def _run(self):
+        try:
+            self.flush()
+            connection.close()
+        except Exception:
+            logger.exception(
+                "Не удалось сбросить переходы по коротким ссылкам"
+            )
+        finally:
+            self._schedule()
+
+    def _take(self):
+        clicks, self._clicks = self._clicks, Counter()
+        self._pending = 0
+        return clicks
+
+    def _write(self, clicks):
+        if not clicks:
+            return
+        try:
+            ShortLink.objects.filter(pk__in=clicks).update(
+                clicks=F("clicks")
+                + Case(
+                    *[
+                        When(pk=pk, then=Value(count))
+                        for pk, count in clicks.items()
+                    ],
+                    default=Value(0),
+                )
+            )
+        except DatabaseError:
+            logger.exception(
+                "Не удалось сохранить переходы по %s коротким ссылкам",
+                len(clicks),
+            )
+            with self._lock:
+                self._clicks.update(clicks)
+                self._pending += sum(clicks.values())
+
+
+short_link_resolver = ShortLinkResolver(
+    SHORT_LINK_LOCAL_CACHE_SIZE,
+    SHORT_LINK_LOCAL_CACHE_TIMEOUT,
+    SHORT_LINK_CACHE_TIMEOUT,
+)
+click_counter = ClickCounter(
+    SHORT_LINK_CLICKS_FLUSH_SIZE, SHORT_LINK_CLICKS_FLUSH_INTERVAL
+)
+atexit.register(click_counter.flush)
@@ -0,0 +1,58 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_recipe, invalidate_recipe_relations
+from .catalogs import ingredient_catalog, tag_catalog
+from .models import Ingredient, Recipe, ShortLink, Tag
+from .pantry import pantry_index
+from .search import search_index
+from .shortlinks import short_link_resolver
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_catalog(sender, **kwargs):
+    transaction.on_commit(tag_catalog.invalidate)
+    transaction.on_commit(invalidate_recipe_relations)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_catalog(sender, **kwargs):
+    transaction.on_commit(ingredient_catalog.invalidate)
+    transaction.on_commit(invalidate_recipe_relations)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_recipe_cache(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_recipe, instance.pk))
+
+
+def index_recipe(sender, instance, **kwargs):
+    transaction.on_commit(partial(search_index.update, instance.pk))
+
+
+if connection.vendor != "postgresql":
+    post_save.connect(index_recipe, sender=Recipe)
+    post_delete.connect(index_recipe, sender=Recipe)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe_ingredients(sender, instance, **kwargs):
+    transaction.on_commit(partial(pantry_index.update, instance.pk))
+
+
+@receiver(post_delete, sender=ShortLink)
+def forget_short_link(sender, instance, **kwargs):
+    transaction.on_commit(partial(short_link_resolver.forget, instance.code))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_author_cache(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(invalidate_recipe_relations)
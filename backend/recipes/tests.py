@@ -0,0 +1,969 @@
+import base64
+import io
+import json
+import random
+import tempfile
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from users.models import Follow
+
+from . import images, shopping_list
+from .catalogs import tag_catalog
+from .counters import reconcile
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListItem, ShortLink, Tag, User)
+from .pantry import PantryIndex, pantry_index
+from .search import RecipeSearchIndex
+from .shortlinks import ClickCounter, click_counter, short_link_resolver
+from .transfer import export_records
+
+RECIPES_COUNT = 12
+
+
+def make_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class RecipeReadTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com",
+            username="reader",
+            first_name="Reader",
+            last_name="Reader",
+            password="reader-password",
+        )
+        authors = [
+            User.objects.create_user(
+                email=f"author{number}@example.com",
+                username=f"author{number}",
+                first_name="Author",
+                last_name=str(number),
+                password="author-password",
+            )
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.user, author=authors[0])
+        tags = [
+            Tag.objects.create(name=f"Тег {number}", slug=f"tag-{number}")
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f"Ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(5)
+        ]
+        cls.recipes = []
+        for number in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=authors[number % len(authors)],
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/test.jpg",
+            )
+            recipe.tags.set(tags[:number % len(tags) + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in ingredients[:number % len(ingredients) + 1]
+            )
+            cls.recipes.append(recipe)
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for limit in (6, 100):
+            with self.subTest(limit=limit), self.assertNumQueries(5):
+                response = self.client.get(
+                    "/api/recipes/", {"limit": limit}
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                len(response.data["results"]), min(limit, RECIPES_COUNT)
+            )
+
+    def test_retrieve_queries(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(f"/api/recipes/{self.recipes[0].pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["is_favorited"])
+        self.assertTrue(response.data["author"]["is_subscribed"])
+
+    def test_cursor_pages_follow_each_other(self):
+        response = self.client.get(
+            "/api/recipes/", {"cursor": "", "limit": 5}
+        )
+        seen = [recipe["id"] for recipe in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            self.assertEqual(response.status_code, 200)
+            seen += [recipe["id"] for recipe in response.data["results"]]
+        self.assertEqual(
+            seen, [recipe.pk for recipe in reversed(self.recipes)]
+        )
+
+    def test_invalid_cursor_is_not_found(self):
+        cursors = (
+            "not-base64!",
+            make_cursor({"a": 1}),
+            make_cursor([1]),
+            make_cursor(["x", "y"]),
+            make_cursor([None, None]),
+            make_cursor([{"a": 1}, 1]),
+            make_cursor(["2024-01-01T00:00:00+00:00", "1"]),
+            make_cursor(["2024-01-01T00:00:00+00:00", True]),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/api/recipes/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+        response = self.client.get("/api/recipes/", {
+            "cursor": make_cursor([0, 1, "x"]), "ordering": "trending",
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class ShoppingListTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, *cls.buyers = [
+            User.objects.create_user(
+                email=f"{name}@example.com",
+                username=name,
+                first_name=name.title(),
+                last_name=name.title(),
+                password=f"{name}-password",
+            )
+            for name in ("author", "first", "second")
+        ]
+        cls.tag = Tag.objects.create(name="Тег", slug="tag")
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"Ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(4)
+        ]
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/test.jpg",
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in cls.ingredients[number:number + 2]
+            )
+            cls.recipes.append(recipe)
+
+    def items(self):
+        return set(
+            ShoppingListItem.objects.values_list(
+                "user_id", "ingredient_id", "amount"
+            )
+        )
+
+    def assert_consistent(self):
+        self.assertEqual(shopping_list.find_mismatches(), [])
+
+    def cart(self, user, recipe, method="post"):
+        self.client.force_authenticate(user)
+        response = getattr(self.client, method)(
+            f"/api/recipes/{recipe.pk}/shopping_cart/"
+        )
+        self.assertIn(response.status_code, (201, 204))
+
+    def test_deltas_match_rebuild(self):
+        first, second = self.buyers
+        for user, recipe in (
+            (first, self.recipes[0]),
+            (first, self.recipes[1]),
+            (second, self.recipes[1]),
+            (second, self.recipes[2]),
+        ):
+            self.cart(user, recipe)
+            self.assert_consistent()
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f"/api/recipes/{self.recipes[1].pk}/",
+            {
+                "name": "Рецепт 1",
+                "text": "Описание",
+                "cooking_time": 10,
+                "tags": [self.tag.pk],
+                "ingredients": [
+                    {"id": self.ingredients[2].pk, "amount": 7},
+                    {"id": self.ingredients[3].pk, "amount": 1},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_consistent()
+        self.cart(first, self.recipes[0], "delete")
+        self.assert_consistent()
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f"/api/recipes/{self.recipes[2].pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assert_consistent()
+        items = self.items()
+        shopping_list.rebuild()
+        self.assertEqual(self.items(), items)
+        self.assertEqual(
+            items,
+            {
+                (first.pk, self.ingredients[2].pk, 7),
+                (first.pk, self.ingredients[3].pk, 1),
+                (second.pk, self.ingredients[2].pk, 7),
+                (second.pk, self.ingredients[3].pk, 1),
+            },
+        )
+
+
+class IngredientDiffTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            first_name="Author",
+            last_name="Author",
+            password="author-password",
+        )
+        cls.tag = Tag.objects.create(name="Тег", slug="tag")
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"Ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(4)
+        ]
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/test.jpg",
+        )
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=cls.recipe, ingredient=ingredient, amount=1
+            )
+            for ingredient in cls.ingredients[:3]
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def rows(self):
+        rows = self.recipe.ingredients.values_list(
+            "id", "ingredient_id", "amount"
+        )
+        return {
+            ingredient_id: (pk, amount) for pk, ingredient_id, amount in rows
+        }
+
+    def patch(self, amounts):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(
+                f"/api/recipes/{self.recipe.pk}/",
+                {
+                    "name": "Рецепт",
+                    "text": "Описание",
+                    "cooking_time": 10,
+                    "tags": [self.tag.pk],
+                    "ingredients": [
+                        {"id": self.ingredients[number].pk, "amount": amount}
+                        for number, amount in amounts.items()
+                    ],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        return [
+            callback.args for callback in callbacks
+            if getattr(callback, "func", None) == pantry_index.update
+        ]
+
+    def test_update_diffs_ingredient_rows(self):
+        before = self.rows()
+        first, second, third, fourth = (
+            ingredient.pk for ingredient in self.ingredients
+        )
+        pantry_updates = self.patch({0: 1, 1: 5, 3: 2})
+        after = self.rows()
+        self.assertEqual(set(after), {first, second, fourth})
+        self.assertEqual(after[first], before[first])
+        self.assertEqual(after[second], (before[second][0], 5))
+        self.assertNotIn(third, after)
+        self.assertEqual(after[fourth][1], 2)
+        self.assertEqual(pantry_updates, [(self.recipe.pk,)])
+
+    def test_amount_change_keeps_pantry_index(self):
+        before = self.rows()
+        self.assertEqual(self.patch({0: 3, 1: 1, 2: 1}), [])
+        after = self.rows()
+        self.assertEqual(
+            {key: pk for key, (pk, _) in after.items()},
+            {key: pk for key, (pk, _) in before.items()},
+        )
+        self.assertEqual(after[self.ingredients[0].pk][1], 3)
+
+
+class ShoppingListExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com",
+            username="buyer",
+            first_name="Buyer",
+            last_name="Buyer",
+            password="buyer-password",
+        )
+        recipe = Recipe.objects.create(
+            author=self.user,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/test.jpg",
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe,
+            ingredient=Ingredient.objects.create(
+                name="Соль", measurement_unit="г"
+            ),
+            amount=5,
+        )
+        self.client.force_authenticate(self.user)
+        self.client.post(f"/api/recipes/{recipe.pk}/shopping_cart/")
+
+    def download(self, file_format):
+        return self.client.get(
+            "/api/recipes/download_shopping_cart/",
+            {"file_format": file_format},
+        )
+
+    def test_text_formats_are_streamed(self):
+        for file_format in ("txt", "csv"):
+            with self.subTest(file_format=file_format):
+                response = self.download(file_format)
+                self.assertTrue(response.streaming)
+                self.assertIn(
+                    "Соль",
+                    b"".join(response.streaming_content).decode(),
+                )
+
+    def test_pdf_is_sent_whole(self):
+        response = self.download("pdf")
+        self.assertFalse(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(response.content.startswith(b"%PDF"))
+        self.assertEqual(self.download("xml").status_code, 400)
+
+
+class CounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = [
+            User.objects.create_user(
+                email=f"{name}@example.com",
+                username=name,
+                first_name=name.title(),
+                last_name=name.title(),
+                password=f"{name}-password",
+            )
+            for name in ("author", "reader")
+        ]
+        cls.tag = Tag.objects.create(name="Тег", slug="tag")
+        cls.ingredient = Ingredient.objects.create(
+            name="Ингредиент", measurement_unit="г"
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/test.jpg",
+        )
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=1
+        )
+        reconcile()
+
+    def test_counters_follow_relation_churn(self):
+        self.client.force_authenticate(self.reader)
+        for url in (
+            f"/api/recipes/{self.recipe.pk}/favorite/",
+            f"/api/recipes/{self.recipe.pk}/shopping_cart/",
+            f"/api/users/{self.author.pk}/subscribe/",
+        ):
+            with self.subTest(url=url):
+                for _ in range(3):
+                    self.assertEqual(self.client.post(url).status_code, 201)
+                    self.assertEqual(self.client.delete(url).status_code, 204)
+                self.assertEqual(self.client.post(url).status_code, 201)
+                self.assertEqual(self.client.post(url).status_code, 400)
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.recipe.carts_count, 1)
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(
+            [changed for _, _, changed in reconcile(fix=False)], [0] * 4
+        )
+
+    def test_recipe_edit_keeps_counters(self):
+        def favorite_during_edit(*args):
+            Recipe.objects.filter(pk=self.recipe.pk).update(
+                favorites_count=3, carts_count=2, trending_score=1.5
+            )
+
+        self.client.force_authenticate(self.author)
+        with mock.patch(
+            "recipes.serializers.change_recipe",
+            side_effect=favorite_during_edit,
+        ):
+            response = self.client.patch(
+                f"/api/recipes/{self.recipe.pk}/",
+                {
+                    "name": "Новый рецепт",
+                    "text": "Новое описание",
+                    "cooking_time": 5,
+                    "tags": [self.tag.pk],
+                    "ingredients": [{"id": self.ingredient.pk, "amount": 2}],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, "Новый рецепт")
+        self.assertEqual(
+            (
+                self.recipe.favorites_count,
+                self.recipe.carts_count,
+                self.recipe.trending_score,
+            ),
+            (3, 2, 1.5),
+        )
+
+
+class CatalogInvalidationTests(TestCase):
+    def test_tag_catalog_is_invalidated_after_commit(self):
+        with mock.patch.object(
+            tag_catalog, "invalidate"
+        ) as invalidate, self.captureOnCommitCallbacks() as callbacks:
+            Tag.objects.create(name="Тег", slug="tag")
+            invalidate.assert_not_called()
+        for callback in callbacks:
+            callback()
+        invalidate.assert_called_once_with()
+
+
+class LoadIngredientsTests(TestCase):
+    def test_counts_inserted_existing_and_duplicate_rows(self):
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".ndjson", encoding="utf-8"
+        ) as source:
+            for name in ("соль", "перец", "перец", "", "сахар"):
+                source.write(json.dumps(
+                    {"name": name, "measurement_unit": "г"}
+                ) + "\n")
+            source.flush()
+            output = io.StringIO()
+            call_command(
+                "load_ingredients", source.name, batch_size=2, stdout=output
+            )
+        self.assertIn(
+            "Добавлено: 2, уже в базе: 1, повторов в файле: 1, "
+            "некорректных записей: 1",
+            output.getvalue(),
+        )
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+
+class TagFilterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            first_name="Author",
+            last_name="Author",
+            password="author-password",
+        )
+        breakfast, lunch, dinner = [
+            Tag.objects.create(name=slug, slug=slug)
+            for slug in ("breakfast", "lunch", "dinner")
+        ]
+        cls.recipes = {}
+        for name, tags in (
+            ("breakfast", [breakfast]),
+            ("brunch", [breakfast, lunch]),
+            ("supper", [lunch, dinner]),
+            ("snack", []),
+        ):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=name,
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/test.jpg",
+            )
+            recipe.tags.set(tags)
+            cls.recipes[name] = recipe.pk
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, **params):
+        response = self.client.get("/api/recipes/", params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(recipe["name"] for recipe in response.data["results"])
+
+    def test_any_and_all_matching(self):
+        tags = ["breakfast", "lunch"]
+        self.assertEqual(
+            self.names(tags=tags), ["breakfast", "brunch", "supper"]
+        )
+        self.assertEqual(
+            self.names(tags=tags, tags_match="any"),
+            ["breakfast", "brunch", "supper"],
+        )
+        self.assertEqual(self.names(tags=tags, tags_match="all"), ["brunch"])
+        self.assertEqual(
+            self.names(tags=["dinner"], tags_match="all"), ["supper"]
+        )
+        self.assertEqual(
+            self.names(tags=["breakfast", "dinner"], tags_match="all"), []
+        )
+        self.assertEqual(len(self.names()), len(self.recipes))
+
+    def test_invalid_parameters(self):
+        for params in (
+            {"tags": ["unknown"]},
+            {"tags": ["lunch"], "tags_match": "some"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get("/api/recipes/", params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_new_tag_is_accepted_after_commit(self):
+        self.assertEqual(
+            self.client.get(
+                "/api/recipes/", {"tags": ["brunch"]}
+            ).status_code,
+            400,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.create(name="brunch", slug="brunch")
+        Recipe.objects.get(pk=self.recipes["brunch"]).tags.add(tag)
+        self.assertEqual(self.names(tags=["brunch"]), ["brunch"])
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.image = default_storage.save(
+            "recipes/images/transfer.jpg", ContentFile(b"image")
+        )
+        tags = [
+            Tag.objects.create(name=f"Тег {number}", slug=f"tag-{number}")
+            for number in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f"Ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(3)
+        ]
+        for number in range(2):
+            author = User.objects.create_user(
+                email=f"author{number}@example.com",
+                username=f"author{number}",
+                first_name="Author",
+                last_name=str(number),
+                password="author-password",
+            )
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10 + number,
+                image=self.image,
+            )
+            recipe.tags.set(tags[number:])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in ingredients[number:]
+            )
+
+    def export(self, path):
+        call_command("export_recipes", path, stdout=io.StringIO())
+
+    def load(self, path):
+        output = io.StringIO()
+        call_command("import_recipes", path, stdout=output)
+        return output.getvalue()
+
+    def test_ndjson_round_trip(self):
+        records = list(export_records())
+        with tempfile.NamedTemporaryFile(suffix=".ndjson") as dump:
+            self.export(dump.name)
+            User.objects.all().delete()
+            Tag.objects.all().delete()
+            Ingredient.objects.all().delete()
+            default_storage.delete(self.image)
+            self.assertIn("рецептов создано: 2", self.load(dump.name))
+            self.assertEqual(list(export_records()), records)
+            self.assertIn(
+                "рецептов создано: 0, обновлено: 2", self.load(dump.name)
+            )
+        self.assertEqual(list(export_records()), records)
+        self.assertEqual(
+            sorted(User.objects.values_list("recipes_count", flat=True)),
+            [1, 1],
+        )
+        with default_storage.open(self.image) as image:
+            self.assertEqual(image.read(), b"image")
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            first_name="Author",
+            last_name="Author",
+            password="author-password",
+        )
+        self.workers = [
+            RecipeSearchIndex(f"test-search-{self.id()}") for _ in range(2)
+        ]
+
+    def create_recipe(self, name):
+        return Recipe.objects.create(
+            author=self.author,
+            name=name,
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/test.jpg",
+        )
+
+    def test_concurrent_updates_are_not_lost(self):
+        first, second = self.workers
+        soup = self.create_recipe("Борщ")
+        self.assertEqual(first.search("борщ"), [soup.pk])
+        self.assertEqual(second.search("борщ"), [soup.pk])
+        salad = self.create_recipe("Салат")
+        pie = self.create_recipe("Пирог")
+        first.update(salad.pk)
+        second.update(pie.pk)
+        for worker in self.workers:
+            with self.subTest(worker=worker):
+                self.assertEqual(worker.search("салат"), [salad.pk])
+                self.assertEqual(worker.search("пирог"), [pie.pk])
+
+    def test_delete_and_invalidate(self):
+        first, second = self.workers
+        soup = self.create_recipe("Борщ")
+        self.assertEqual(second.search("борщ"), [soup.pk])
+        pk = soup.pk
+        soup.delete()
+        first.update(pk)
+        self.assertEqual(second.search("борщ"), [])
+        salad = Recipe.objects.bulk_create([Recipe(
+            author=self.author,
+            name="Салат",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/test.jpg",
+        )])[0]
+        first.invalidate()
+        self.assertEqual(second.search("салат"), [salad.pk])
+
+
+class PantryIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            first_name="Author",
+            last_name="Author",
+            password="author-password",
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"Ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(3)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/test.jpg",
+            )
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        self.workers = [
+            PantryIndex(f"test-pantry-{self.id()}") for _ in range(2)
+        ]
+
+    def test_concurrent_updates_are_not_lost(self):
+        first, second = self.workers
+        self.assertEqual(first.match([self.ingredients[0].pk]), [])
+        self.assertEqual(second.match([self.ingredients[0].pk]), [])
+        for recipe, ingredient in zip(self.recipes, self.ingredients):
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1
+            )
+        first.update(self.recipes[0].pk)
+        second.update(self.recipes[1].pk)
+        for worker in self.workers:
+            with self.subTest(worker=worker):
+                self.assertEqual(
+                    worker.match([self.ingredients[0].pk]),
+                    [(self.recipes[0].pk, 1, 1)],
+                )
+                self.assertEqual(
+                    worker.match([self.ingredients[1].pk]),
+                    [(self.recipes[1].pk, 1, 1)],
+                )
+
+    def test_recipe_delete_removes_recipe_once(self):
+        recipe = self.recipes[0]
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in self.ingredients
+        )
+        pk = recipe.pk
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe.delete()
+        self.assertEqual(
+            [
+                callback.args for callback in callbacks
+                if getattr(callback, "func", None) == pantry_index.update
+            ],
+            [(pk,)],
+        )
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            first_name="Author",
+            last_name="Author",
+            password="author-password",
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/test.jpg",
+        )
+        self.variants = {"small": "recipes/images/variants/test_small.jpg"}
+
+    def generate(self, instance, field_name, variants_field):
+        with mock.patch.object(
+            images, "build_variants", return_value=self.variants
+        ), mock.patch.object(images, "close_old_connections"):
+            images._generate(
+                type(instance),
+                instance.pk,
+                field_name,
+                variants_field,
+                getattr(instance, field_name).name,
+                {},
+            )
+
+    def test_recipe_variants_invalidate_recipe(self):
+        with mock.patch.object(images, "invalidate_recipe") as invalidate:
+            self.generate(self.recipe, "image", "image_variants")
+        invalidate.assert_called_once_with(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, self.variants)
+
+    def test_avatar_variants_invalidate_user_tokens(self):
+        User.objects.filter(pk=self.author.pk).update(
+            avatar="users/avatars/test.jpg"
+        )
+        self.author.refresh_from_db()
+        with mock.patch(
+            "users.auth.invalidate_user_tokens"
+        ) as invalidate, self.captureOnCommitCallbacks(execute=True):
+            self.generate(self.author, "avatar", "avatar_variants")
+        invalidate.assert_called_once_with(self.author.pk)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.avatar_variants, self.variants)
+
+
+class ClickCounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            first_name="Author",
+            last_name="Author",
+            password="author-password",
+        )
+        recipe = Recipe.objects.create(
+            author=author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/test.jpg",
+        )
+        cls.link = ShortLink.objects.create(recipe=recipe, code="abc123")
+
+    def test_failed_write_keeps_clicks(self):
+        counter = ClickCounter(flush_size=2, flush_interval=60 * 60)
+        counter.add(self.link.pk)
+        with mock.patch.object(
+            ShortLink.objects, "filter", side_effect=DatabaseError
+        ), self.assertLogs("recipes.shortlinks", "ERROR"):
+            counter.add(self.link.pk)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.clicks, 0)
+        counter.add(self.link.pk)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.clicks, 3)
+
+    def test_codes_resolve_until_link_is_deleted(self):
+        cache.clear()
+        target = (self.link.pk, self.link.recipe_id)
+        self.assertEqual(short_link_resolver.resolve("abc123"), target)
+        self.assertEqual(short_link_resolver.resolve("abc123"), target)
+        for code in ("", "missing", "abc/123", "x" * 100):
+            with self.subTest(code=code):
+                self.assertIsNone(short_link_resolver.resolve(code))
+        with self.captureOnCommitCallbacks(execute=True):
+            ShortLink.objects.get(pk=self.link.pk).delete()
+        self.assertIsNone(short_link_resolver.resolve("abc123"))
+
+    def test_redirect_clicks_are_flushed(self):
+        with mock.patch.object(click_counter, "_start_timer"):
+            for _ in range(2):
+                response = self.client.get("/s/abc123/")
+                self.assertEqual(response.status_code, 302)
+                self.assertEqual(
+                    response["Location"], f"/recipes/{self.link.recipe_id}"
+                )
+            self.assertEqual(self.client.get("/s/missing/").status_code, 404)
+        click_counter.flush()
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.clicks, 2)
+
+    def test_timer_survives_errors(self):
+        counter = ClickCounter(flush_size=10, flush_interval=60 * 60)
+        with mock.patch.object(counter, "_schedule") as schedule:
+            counter.add(self.link.pk)
+            schedule.reset_mock()
+            with mock.patch.object(
+                counter, "flush", side_effect=RuntimeError
+            ), self.assertLogs("recipes.shortlinks", "ERROR"):
+                counter._run()
+            schedule.assert_called_once_with()
+            with mock.patch("recipes.shortlinks.connection"):
+                counter._run()
+            self.assertEqual(schedule.call_count, 2)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.clicks, 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "Планы запросов PostgreSQL")
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        choice = random.Random(0)
+        users = User.objects.bulk_create(
+            User(
+                email=f"user{number}@example.com",
+                username=f"user{number}",
+                first_name="User",
+                last_name=str(number),
+                password="!",
+            )
+            for number in range(1000)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"Тег {number}", slug=f"tag-{number}")
+            for number in range(10)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {number}", measurement_unit="г")
+            for number in range(2000)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=choice.choice(users),
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/test.jpg",
+            )
+            for number in range(20000)
+        )
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe_id=recipe.pk, tag_id=tag.pk)
+            for recipe in recipes
+            for tag in choice.sample(tags, 2)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe.pk, ingredient_id=ingredient.pk, amount=1
+            )
+            for recipe in recipes
+            for ingredient in choice.sample(ingredients, 4)
+        )
+        Follow.objects.bulk_create(
+            Follow(user_id=user.pk, author_id=author.pk)
+            for user in users
+            for author in choice.sample(users, 20)
+            if author.pk != user.pk
+        )
+        for model, count in ((Favorite, 30), (ShoppingCart, 5)):
+            model.objects.bulk_create(
+                model(user_id=user.pk, recipe_id=recipe.pk)
+                for user in users
+                for recipe in choice.sample(recipes, count)
+            )
+        shopping_list.rebuild()
+
+    def test_hot_endpoints_do_not_filter_with_full_scans(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        call_command("check_query_plans", stdout=io.StringIO())
@@ -0,0 +1,279 @@
+import base64
+from datetime import datetime
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch
+
+from . import feed, shopping_list
+from .cache import (RECIPES_VERSION, bump_version,
+                    invalidate_recipe_relations)
+from .catalogs import ingredient_catalog, tag_catalog
+from .counters import reconcile
+from .models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag,
+                     User)
+from .pantry import pantry_index
+from .search import search_index
+
+AUTHOR_FIELDS = ("email", "username", "first_name", "last_name")
+RECIPE_FIELDS = ("name", "text", "cooking_time")
+RECORD_TYPES = ("tag", "ingredient", "author", "recipe")
+
+
+def _read_image(field_file):
+    with field_file.open("rb") as source:
+        return base64.b64encode(source.read()).decode()
+
+
+def export_records(include_images=True, chunk_size=1000):
+    for slug, name in Tag.objects.order_by("id").values_list("slug", "name"):
+        yield {"type": "tag", "slug": slug, "name": name}
+    ingredients = Ingredient.objects.order_by("id").values_list(
+        "name", "measurement_unit"
+    )
+    for name, unit in ingredients.iterator(chunk_size=chunk_size):
+        yield {"type": "ingredient", "name": name, "measurement_unit": unit}
+    authors = (
+        User.objects.filter(pk__in=Recipe.objects.values("author_id"))
+        .order_by("id")
+        .values_list(*AUTHOR_FIELDS)
+    )
+    for values in authors.iterator(chunk_size=chunk_size):
+        yield {"type": "author", **dict(zip(AUTHOR_FIELDS, values))}
+    recipes = (
+        Recipe.objects.order_by("id")
+        .select_related("author")
+        .prefetch_related(
+            "tags",
+            Prefetch(
+                "ingredients",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
+    )
+    for recipe in recipes.iterator(chunk_size=chunk_size):
+        image = {"name": recipe.image.name}
+        if include_images and recipe.image:
+            image["content"] = _read_image(recipe.image)
+        yield {
+            "type": "recipe",
+            "author": recipe.author.email,
+            "name": recipe.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "pub_date": recipe.pub_date.isoformat(),
+            "image": image,
+            "tags": [tag.slug for tag in recipe.tags.all()],
+            "ingredients": [
+                [
+                    item.ingredient.name,
+                    item.ingredient.measurement_unit,
+                    item.amount,
+                ]
+                for item in recipe.ingredients.all()
+            ],
+        }
+
+
+class RecipeImporter:
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.buffers = {name: [] for name in RECORD_TYPES}
+        self.tags = {}
+        self.ingredients = {}
+        self.authors = {}
+        self.updated_recipes = set()
+        self.stats = dict.fromkeys(
+            ("created", "updated", "skipped", "images"), 0
+        )
+
+    def add(self, record):
+        record_type = record.get("type")
+        if record_type not in self.buffers:
+            self.stats["skipped"] += 1
+            return False
+        self.buffers[record_type].append(record)
+        if len(self.buffers[record_type]) >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        with transaction.atomic():
+            self._import_tags(self.buffers["tag"])
+            self._import_ingredients(self.buffers["ingredient"])
+            self._import_authors(self.buffers["author"])
+            self._import_recipes(self.buffers["recipe"])
+        for records in self.buffers.values():
+            records.clear()
+
+    def finish(self):
+        self.flush()
+        with transaction.atomic():
+            reconcile()
+            user_ids = list(
+                ShoppingCart.objects.filter(
+                    recipe_id__in=self.updated_recipes
+                )
+                .values_list("user_id", flat=True)
+                .distinct()
+            )
+            if user_ids:
+                shopping_list.rebuild(user_ids)
+        tag_catalog.invalidate()
+        ingredient_catalog.invalidate()
+        invalidate_recipe_relations()
+        bump_version(RECIPES_VERSION)
+        search_index.invalidate()
+        pantry_index.invalidate()
+        return self.stats
+
+    def _import_tags(self, records):
+        if not records:
+            return
+        slugs = {record["slug"]: record["name"] for record in records}
+        Tag.objects.bulk_create(
+            [Tag(slug=slug, name=name) for slug, name in slugs.items()],
+            ignore_conflicts=True,
+        )
+        self.tags.update(
+            Tag.objects.filter(slug__in=slugs).values_list("slug", "id")
+        )
+
+    def _import_ingredients(self, records):
+        if not records:
+            return
+        keys = dict.fromkeys(
+            (record["name"], record["measurement_unit"]) for record in records
+        )
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in keys
+            ],
+            ignore_conflicts=True,
+        )
+        for pk, name, unit in Ingredient.objects.filter(
+            name__in={name for name, _ in keys}
+        ).values_list("id", "name", "measurement_unit"):
+            if (name, unit) in keys:
+                self.ingredients[name, unit] = pk
+
+    def _import_authors(self, records):
+        if not records:
+            return
+        authors = {record["email"]: record for record in records}
+        existing = User.objects.in_bulk(authors, field_name="email")
+        created = []
+        updated = []
+        for email, record in authors.items():
+            user = existing.get(email)
+            if user is None:
+                user = User(**{
+                    field: record[field] for field in AUTHOR_FIELDS
+                })
+                user.set_unusable_password()
+                created.append(user)
+            elif any(
+                getattr(user, field) != record[field]
+                for field in ("first_name", "last_name")
+            ):
+                user.first_name = record["first_name"]
+                user.last_name = record["last_name"]
+                updated.append(user)
+        User.objects.bulk_create(created, ignore_conflicts=True)
+        User.objects.bulk_update(updated, ["first_name", "last_name"])
+        self.authors.update(
+            User.objects.filter(email__in=authors).values_list("email", "id")
+        )
+
+    def _save_image(self, image):
+        name = image.get("name") or ""
+        content = image.get("content")
+        if content and name and not default_storage.exists(name):
+            name = default_storage.save(
+                name, ContentFile(base64.b64decode(content))
+            )
+            self.stats["images"] += 1
+        return name
+
+    def _import_recipes(self, records):
+        valid = []
+        for record in records:
+            author_id = self.authors.get(record["author"])
+            if author_id is None:
+                self.stats["skipped"] += 1
+                continue
+            valid.append((author_id, record))
+        if not valid:
+            return
+        existing = {
+            (recipe.author_id, recipe.name): recipe
+            for recipe in Recipe.objects.filter(
+                author_id__in={author_id for author_id, _ in valid},
+                name__in={record["name"] for _, record in valid},
+            )
+        }
+        created = []
+        updated = []
+        recipes = []
+        for author_id, record in valid:
+            recipe = existing.get((author_id, record["name"]))
+            if recipe is None:
+                recipe = Recipe(author_id=author_id)
+                created.append(recipe)
+            else:
+                updated.append(recipe)
+            for field in RECIPE_FIELDS:
+                setattr(recipe, field, record[field])
+            image = self._save_image(record.get("image") or {})
+            if recipe.image.name != image:
+                recipe.image = image
+                recipe.image_variants = {}
+            recipes.append((recipe, record))
+        Recipe.objects.bulk_create(created, batch_size=self.batch_size)
+        for recipe, record in recipes:
+            recipe.pub_date = datetime.fromisoformat(record["pub_date"])
+        Recipe.objects.bulk_update(
+            [recipe for recipe, _ in recipes],
+            [*RECIPE_FIELDS, "image", "image_variants", "pub_date"],
+            batch_size=self.batch_size,
+        )
+        self._replace_relations(recipes, updated)
+        feed.add_recipes(created)
+        self.updated_recipes.update(recipe.pk for recipe in updated)
+        self.stats["created"] += len(created)
+        self.stats["updated"] += len(updated)
+
+    def _replace_relations(self, recipes, updated):
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.filter(recipe__in=updated).delete()
+        RecipeIngredient.objects.filter(recipe__in=updated).delete()
+        RecipeTag.objects.bulk_create(
+            [
+                RecipeTag(recipe_id=recipe.pk, tag_id=self.tags[slug])
+                for recipe, record in recipes
+                for slug in set(record["tags"])
+                if slug in self.tags
+            ],
+            batch_size=self.batch_size,
+        )
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe_id=recipe.pk,
+                    ingredient_id=self.ingredients[name, unit],
+                    amount=amount,
+                )
+                for recipe, record in recipes
+                for (name, unit), amount in {
+                    (name, unit): amount
+                    for name, unit, amount in record["ingredients"]
+                }.items()
+                if (name, unit) in self.ingredients
+            ],
+            batch_size=self.batch_size,
+        )
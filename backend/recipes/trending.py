@@ -0,0 +1,57 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .cache import RECIPES_VERSION, bump_version
+from .constants import (TRENDING_BATCH_SIZE, TRENDING_CART_WEIGHT,
+                        TRENDING_FAVORITE_WEIGHT, TRENDING_HALF_LIFE_HOURS,
+                        TRENDING_WINDOW_DAYS)
+from .models import Favorite, Recipe, ShoppingCart
+
+SOURCES = (
+    (Favorite, TRENDING_FAVORITE_WEIGHT),
+    (ShoppingCart, TRENDING_CART_WEIGHT),
+)
+
+
+def compute_scores(now=None):
+    now = now or timezone.now()
+    since = now - timedelta(days=TRENDING_WINDOW_DAYS)
+    scores = defaultdict(float)
+    for model, weight in SOURCES:
+        rows = (
+            model.objects.filter(created__gte=since)
+            .values_list("recipe_id", "created")
+            .iterator(chunk_size=TRENDING_BATCH_SIZE)
+        )
+        for recipe_id, created in rows:
+            age = (now - created).total_seconds() / 3600
+            scores[recipe_id] += weight * 0.5 ** (
+                age / TRENDING_HALF_LIFE_HOURS
+            )
+    return scores
+
+
+def store_scores(scores):
+    current = dict(
+        Recipe.objects.exclude(trending_score=0).values_list(
+            "id", "trending_score"
+        )
+    )
+    stale = [pk for pk in current if pk not in scores]
+    for start in range(0, len(stale), TRENDING_BATCH_SIZE):
+        Recipe.objects.filter(
+            id__in=stale[start:start + TRENDING_BATCH_SIZE]
+        ).update(trending_score=0)
+    changed = [
+        Recipe(id=pk, trending_score=score)
+        for pk, score in scores.items()
+        if current.get(pk) != score
+    ]
+    Recipe.objects.bulk_update(
+        changed, ["trending_score"], batch_size=TRENDING_BATCH_SIZE
+    )
+    if stale or changed:
+        bump_version(RECIPES_VERSION)
+    return len(changed), len(stale)
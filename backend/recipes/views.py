@@ -1,5 +1,8 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.transaction import atomic
+from django.http import (Http404, HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
+from django.urls import reverse
+from django.utils.http import content_disposition_header
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -7,14 +10,43 @@ from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from . import cache, feed, shopping_list
+from .autocomplete import ingredient_index
+from .catalogs import catalog_response, ingredient_catalog, tag_catalog
+from .constants import (INGREDIENT_AUTOCOMPLETE_LIMIT,
+                        INGREDIENT_AUTOCOMPLETE_MAX_LIMIT, RECIPE_PAGE_URL,
+                        SHOPPING_LIST_CHUNK_SIZE, SHOPPING_LIST_FILENAME)
+from .counters import change_counter
+from .exports import EXPORT_FORMATS, STREAMED_FORMATS
 from .filters import IngredientFilter, RecipeFilter
-from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
-from .pagination import AnyPageNumberPagination
+from .models import (Favorite, FeedEntry, Ingredient, Recipe, ShoppingCart,
+                     ShoppingListItem, Tag, User)
+from .pagination import (AnyPageNumberPagination, FeedPagination,
+                         RecipePagination, TimelinePagination)
+from .pantry import pantry_index
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (IngredientSerializer, RecipeMinifiedSerializer,
+from .serializers import (CookableQuerySerializer, CookableRecipeSerializer,
+                          IngredientSerializer, RecipeMinifiedSerializer,
                           RecipeReadSerializer, RecipeWriteSerializer,
                           TagSerializer)
+from .shortlinks import click_counter, get_short_link, short_link_resolver
+
+
+def short_link_redirect(request, code):
+    target = short_link_resolver.resolve(code)
+    if target is None:
+        raise Http404
+    link_id, recipe_id = target
+    click_counter.add(link_id)
+    return HttpResponseRedirect(RECIPE_PAGE_URL.format(recipe_id))
+
+
+def recipe_list_params(paginator):
+    return set(RecipeFilter.base_filters) | {
+        paginator.page_query_param,
+        paginator.page_size_query_param,
+        paginator.cursor_query_param,
+    }
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -23,6 +55,9 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return catalog_response(request, tag_catalog)
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
@@ -32,6 +67,28 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("name"):
+            return super().list(request, *args, **kwargs)
+        return catalog_response(request, ingredient_catalog)
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        try:
+            limit = int(
+                request.query_params.get(
+                    "limit", INGREDIENT_AUTOCOMPLETE_LIMIT
+                )
+            )
+        except ValueError:
+            limit = INGREDIENT_AUTOCOMPLETE_LIMIT
+        limit = max(1, min(limit, INGREDIENT_AUTOCOMPLETE_MAX_LIMIT))
+        return Response(
+            ingredient_index.search(
+                request.query_params.get("name", ""), limit
+            )
+        )
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
@@ -41,20 +98,130 @@ class RecipeViewSet(viewsets.ModelViewSet):
     ]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
-    pagination_class = AnyPageNumberPagination
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = super().get_queryset().with_user_flags(user)
+        if self.request.method == "GET":
+            queryset = queryset.with_related(user)
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method in ("POST", "PATCH"):
             return RecipeWriteSerializer
         return RecipeReadSerializer
 
+    def _cached_response(self, request, get_key, handler, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = get_key()
+        data = cache.get_response_data(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set_response_data(key, response.data)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        allowed = recipe_list_params(self.paginator)
+        return self._cached_response(
+            request,
+            lambda: cache.recipe_list_key(request, allowed),
+            super().list,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        if not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        return self._cached_response(
+            request,
+            lambda: cache.recipe_detail_key(request, int(pk)),
+            super().retrieve,
+            *args,
+            **kwargs,
+        )
+
+    @action(detail=False, methods=["get"])
+    def cookable(self, request):
+        data = {"ingredients": request.query_params.getlist("ingredients")}
+        if "max_missing" in request.query_params:
+            data["max_missing"] = request.query_params["max_missing"]
+        params = CookableQuerySerializer(data=data)
+        params.is_valid(raise_exception=True)
+        paginator = AnyPageNumberPagination()
+        page = paginator.paginate_queryset(
+            pantry_index.match(
+                params.validated_data["ingredients"],
+                params.validated_data.get("max_missing"),
+            ),
+            request,
+            self,
+        )
+        recipes = self.get_queryset().in_bulk(pk for pk, _, _ in page)
+        results = []
+        for pk, matched, total in page:
+            recipe = recipes.get(pk)
+            if recipe is None:
+                continue
+            recipe.coverage = round(matched / total, 4)
+            recipe.missing_count = total - matched
+            results.append(recipe)
+        serializer = CookableRecipeSerializer(
+            results, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        if not request.user.feed_timeline:
+            paginator = FeedPagination()
+            page = paginator.paginate_queryset(
+                feed.feed_recipes(self.get_queryset(), request.user),
+                request,
+                self,
+            )
+        else:
+            paginator = TimelinePagination()
+            entries = paginator.paginate_queryset(
+                FeedEntry.objects.filter(user=request.user), request, self
+            )
+            recipes = self.get_queryset().in_bulk(
+                entry.recipe_id for entry in entries
+            )
+            page = [
+                recipes[entry.recipe_id]
+                for entry in entries
+                if entry.recipe_id in recipes
+            ]
+        serializer = RecipeReadSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @atomic
+    def perform_destroy(self, instance):
+        shopping_list.drop_recipe(instance)
+        instance.delete()
+        change_counter(User, instance.author_id, "recipes_count", -1)
+
     @action(
         detail=True,
         methods=["post", "delete"],
         permission_classes=[IsAuthenticated],
     )
     def favorite(self, request, pk):
-        return self._add_remove_relation(request, Favorite, pk, "favorites")
+        return self._add_remove_relation(
+            request, Favorite, pk, "favorites", "favorites_count"
+        )
 
     @action(
         detail=True,
@@ -63,10 +230,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk):
         return self._add_remove_relation(
-            request, ShoppingCart, pk, "shopping_cart"
+            request,
+            ShoppingCart,
+            pk,
+            "shopping_cart",
+            "carts_count",
+            on_add=shopping_list.add_recipe,
+            on_remove=shopping_list.remove_recipe,
         )
 
-    def _add_remove_relation(self, request, model, pk, error_field):
+    @atomic
+    def _add_remove_relation(
+        self,
+        request,
+        model,
+        pk,
+        error_field,
+        counter,
+        on_add=None,
+        on_remove=None,
+    ):
         recipe = self.get_object()
         if request.method == "POST":
             _, created = model.objects.get_or_create(
@@ -78,6 +261,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     {"errors": "Уже добавлено"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            change_counter(Recipe, recipe.pk, counter, 1)
+            if on_add:
+                on_add(request.user, recipe)
             serializer = RecipeMinifiedSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         obj = model.objects.filter(user=request.user, recipe=recipe)
@@ -87,6 +273,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 {"errors": "Не добавлено"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        change_counter(Recipe, recipe.pk, counter, -deleted)
+        if on_remove:
+            on_remove(request.user, recipe)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -95,30 +284,38 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated],
     )
     def download_shopping_cart(self, request):
+        file_format = request.query_params.get("file_format", "txt")
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"errors": "Неподдерживаемый формат файла"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__in_cart__user=request.user,
+            ShoppingListItem.objects.filter(user=request.user)
+            .values(
+                "ingredient__name", "ingredient__measurement_unit", "amount"
             )
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(amount=Sum("amount"))
             .order_by("ingredient__name")
         )
-
-        content = "Список покупок\n\n"
-        for ing in ingredients:
-            content += (
-                f"{ing['ingredient__name']} "
-                f"({ing['ingredient__measurement_unit']}) - {ing['amount']}\n"
-            )
-
-        response = HttpResponse(content, content_type="text/plain")
-        response["Content-Disposition"] = (
-            'attachment; filename="список_покупок.txt"'
+        content_type, render = EXPORT_FORMATS[file_format]
+        response_class = (
+            StreamingHttpResponse
+            if file_format in STREAMED_FORMATS
+            else HttpResponse
+        )
+        response = response_class(
+            render(ingredients.iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, f"{SHOPPING_LIST_FILENAME}.{file_format}"
         )
         return response
 
     @action(detail=True, methods=["get"], url_path="get-link")
     def get_link(self, request, pk):
-        recipe = self.get_object()
-        short_link = request.build_absolute_uri(f"/recipes/{recipe.id}")
+        link = get_short_link(self.get_object())
+        short_link = request.build_absolute_uri(
+            reverse("short-link", args=[link.code])
+        )
         return Response({"short-link": short_link})
@@ -9,7 +9,15 @@ User = get_user_model()
 
 @admin.register(User)
 class AnyUserAdmin(UserAdmin):
-    list_display = ("username", "email", "first_name", "last_name", "avatar")
+    list_display = (
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "avatar",
+        "recipes_count",
+        "followers_count",
+    )
     search_fields = ("email", "username")
     list_filter = ("email", "username")
     ordering = ("username",)
@@ -0,0 +1,33 @@
+from recipes.async_views import async_read_view, render
+from recipes.pagination import AsyncLimitOffsetPagination
+
+from .serializers import UserWithRecipesSerializer, get_recipes_limit
+from .views import (UserViewSet, attach_recipes, recent_recipes,
+                    subscribed_authors)
+
+
+async def subscriptions_handler(request):
+    paginator = AsyncLimitOffsetPagination()
+    page = await paginator.apaginate_queryset(
+        subscribed_authors(request.user), request
+    )
+    attach_recipes(
+        page,
+        [
+            recipe async for recipe in
+            recent_recipes(page, get_recipes_limit(request))
+        ],
+    )
+    serializer = UserWithRecipesSerializer(
+        page, many=True, context={"request": request}
+    )
+    return render(paginator.get_paginated_response(serializer.data).data)
+
+
+subscriptions = async_read_view(
+    subscriptions_handler,
+    UserViewSet.as_view(
+        {"get": "subscriptions"}, basename="users", detail=False
+    ),
+    login_required=True,
+)
@@ -1,5 +1,27 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import (TokenAuthentication,
+                                           get_authorization_header)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .constants import (TOKEN_CACHE_TIMEOUT, TOKEN_GENERATION_TIMEOUT,
+                        TOKEN_LOCAL_CACHE_SIZE, TOKEN_LOCAL_CACHE_TIMEOUT,
+                        TOKEN_STATS_FLUSH_INTERVAL)
+
+TOKEN_KEY = "auth:token:{}"
+TOKEN_GENERATION_KEY = "auth:token-generation:{}"
+TOKEN_STATS_KEY = "auth:token-stats:{}"
+TOKEN_STATS = ("local_hits", "shared_hits", "misses")
 
 
 class EmailBackend(ModelBackend):
@@ -11,3 +33,170 @@ class EmailBackend(ModelBackend):
                 return user
         except UserModel.DoesNotExist:
             return None
+
+
+class TokenCache:
+    def __init__(self, size, timeout, shared_timeout):
+        self.size = size
+        self.timeout = timeout
+        self.shared_timeout = shared_timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = Counter()
+
+    def _keys(self, token_key):
+        digest = hashlib.sha256(token_key.encode()).hexdigest()
+        return TOKEN_KEY.format(digest), TOKEN_GENERATION_KEY.format(digest)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+            if sum(self._stats.values()) < TOKEN_STATS_FLUSH_INTERVAL:
+                return
+            stats, self._stats = self._stats, Counter()
+        flush_stats(stats)
+
+    def get(self, token_key):
+        key, generation_key = self._keys(token_key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                data = entry[1]
+            else:
+                data = None
+        if data is not None:
+            self._count("local_hits")
+            return pickle.loads(data)
+        values = cache.get_many([key, generation_key])
+        entry = values.get(key)
+        if entry is None or entry[0] != values.get(generation_key, 0):
+            self._count("misses")
+            return None
+        data = entry[1]
+        self._count("shared_hits")
+        self._store_local(key, data, now)
+        return pickle.loads(data)
+
+    def _store_local(self, key, data, now):
+        with self._lock:
+            self._entries[key] = (now + self.timeout, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def generation(self, token_key):
+        return cache.get(self._keys(token_key)[1], 0)
+
+    def set(self, token_key, user, generation):
+        key = self._keys(token_key)[0]
+        cache.set(key, (generation, pickle.dumps(user)), self.shared_timeout)
+
+    def delete(self, *token_keys):
+        keys = [self._keys(token_key) for token_key in token_keys]
+        with self._lock:
+            for key, generation_key in keys:
+                self._entries.pop(key, None)
+        for key, generation_key in keys:
+            cache.add(generation_key, 0, TOKEN_GENERATION_TIMEOUT)
+            try:
+                cache.incr(generation_key)
+            except ValueError:
+                cache.set(generation_key, 1, TOKEN_GENERATION_TIMEOUT)
+        cache.delete_many([key for key, generation_key in keys])
+
+
+def flush_stats(stats):
+    for name, value in stats.items():
+        key = TOKEN_STATS_KEY.format(name)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.set(key, value, timeout=None)
+
+
+def read_stats():
+    values = cache.get_many(
+        [TOKEN_STATS_KEY.format(name) for name in TOKEN_STATS]
+    )
+    return {
+        name: values.get(TOKEN_STATS_KEY.format(name), 0)
+        for name in TOKEN_STATS
+    }
+
+
+def reset_stats():
+    cache.delete_many([TOKEN_STATS_KEY.format(name) for name in TOKEN_STATS])
+
+
+token_cache = TokenCache(
+    TOKEN_LOCAL_CACHE_SIZE, TOKEN_LOCAL_CACHE_TIMEOUT, TOKEN_CACHE_TIMEOUT
+)
+
+
+def invalidate_user_tokens(*user_ids):
+    keys = list(
+        Token.objects.filter(user_id__in=user_ids).values_list(
+            "key", flat=True
+        )
+    )
+    if keys:
+        token_cache.delete(*keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            generation = token_cache.generation(key)
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, generation)
+            return user, token
+        if not user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        return user, Token(key=key, user=user)
+
+    async def aauthenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise AuthenticationFailed(
+                _("Invalid token header. No credentials provided.")
+            )
+        if len(auth) > 2:
+            raise AuthenticationFailed(
+                _(
+                    "Invalid token header. "
+                    "Token string should not contain spaces."
+                )
+            )
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed(
+                _(
+                    "Invalid token header. "
+                    "Token string should not contain invalid characters."
+                )
+            )
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        user = await sync_to_async(token_cache.get)(key)
+        if user is None:
+            generation = await sync_to_async(token_cache.generation)(key)
+            try:
+                token = await Token.objects.select_related("user").aget(
+                    key=key
+                )
+            except Token.DoesNotExist:
+                raise AuthenticationFailed(_("Invalid token."))
+            user = token.user
+            if user.is_active:
+                await sync_to_async(token_cache.set)(key, user, generation)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        return user, Token(key=key, user=user)
@@ -1,3 +1,8 @@
 USER_EMAIL_MAX_LENGTH = 254
 USER_USERNAME_MAX_LENGTH = 150
 USER_NAME_MAX_LENGTH = 150
+TOKEN_CACHE_TIMEOUT = 60
+TOKEN_GENERATION_TIMEOUT = 24 * 60 * 60
+TOKEN_LOCAL_CACHE_TIMEOUT = 5
+TOKEN_LOCAL_CACHE_SIZE = 1024
+TOKEN_STATS_FLUSH_INTERVAL = 100
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from users.auth import read_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику кэша токенов авторизации'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Сбросить счётчики после вывода',
+        )
+
+    def handle(self, *args, **options):
+        stats = read_stats()
+        total = sum(stats.values())
+        hits = stats['local_hits'] + stats['shared_hits']
+        self.stdout.write(
+            f'Попаданий в локальный кэш: {stats["local_hits"]}\n'
+            f'Попаданий в общий кэш: {stats["shared_hits"]}\n'
+            f'Промахов: {stats["misses"]}'
+        )
+        if total:
+            self.stdout.write(f'Доля попаданий: {hits / total:.1%}')
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Счётчики сброшены'))
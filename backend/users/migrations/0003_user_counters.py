@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_related(model, relation):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{relation: OuterRef("pk")})
+            .order_by()
+            .values(relation)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    User.objects.update(
+        recipes_count=count_related(
+            apps.get_model("recipes", "Recipe"), "author"
+        ),
+        followers_count=count_related(
+            apps.get_model("users", "Follow"), "author"
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_avatar_variants"),
+        ("recipes", "0008_recipe_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="followers_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Подписчиков"),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="recipes_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Рецептов"),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
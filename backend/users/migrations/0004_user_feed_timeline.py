@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="feed_timeline",
+            field=models.BooleanField(default=False, editable=False, verbose_name="Предрассчитанная лента"),
+        ),
+    ]
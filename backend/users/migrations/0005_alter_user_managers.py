@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:13
+
+import users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_user_feed_timeline"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", users.models.UserManager()),
+            ],
+        ),
+    ]
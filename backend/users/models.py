@@ -1,11 +1,29 @@
+from functools import partial
+
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
 
 from .constants import (USER_EMAIL_MAX_LENGTH, USER_NAME_MAX_LENGTH,
                         USER_USERNAME_MAX_LENGTH)
 
 
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        from .auth import invalidate_user_tokens
+
+        pks = list(self.values_list("pk", flat=True))
+        updated = super().update(**kwargs)
+        if pks:
+            transaction.on_commit(partial(invalidate_user_tokens, *pks))
+        return updated
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     email = models.EmailField(
         unique=True,
@@ -29,6 +47,18 @@ class User(AbstractUser):
         null=True,
         blank=True,
     )
+    avatar_variants = models.JSONField(default=dict, blank=True)
+    recipes_count = models.PositiveIntegerField(
+        "Рецептов", default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        "Подписчиков", default=0, editable=False
+    )
+    feed_timeline = models.BooleanField(
+        "Предрассчитанная лента", default=False, editable=False
+    )
+
+    objects = UserManager()
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
@@ -1,21 +1,33 @@
 from drf_base64.fields import Base64ImageField
+from recipes.fields import ImageVariantsField
+from recipes.images import schedule_variants
 from recipes.models import Recipe
 from rest_framework import serializers
 
 from .models import Follow, User
 
 
+def get_recipes_limit(request):
+    try:
+        limit = int(request.query_params.get("recipes_limit", 0))
+    except (AttributeError, ValueError):
+        return None
+    return limit if limit > 0 else None
+
+
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = serializers.ImageField(read_only=True)
+    image_variants = ImageVariantsField("image", "image_variants")
 
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
 
 
 class AnyUserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
-    avatar = Base64ImageField(required=False)
+    avatar = serializers.ImageField(read_only=True)
+    avatar_variants = ImageVariantsField("avatar", "avatar_variants")
 
     class Meta:
         model = User
@@ -27,11 +39,14 @@ class AnyUserSerializer(serializers.ModelSerializer):
             "last_name",
             "is_subscribed",
             "avatar",
+            "avatar_variants",
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context.get("request")
-        return (
+        return bool(
             request
             and request.user.is_authenticated
             and Follow.objects.filter(user=request.user, author=obj).exists()
@@ -45,10 +60,18 @@ class SetAvatarSerializer(serializers.ModelSerializer):
         model = User
         fields = ("avatar",)
 
+    def update(self, instance, validated_data):
+        stale = instance.avatar_variants
+        instance.avatar = validated_data["avatar"]
+        instance.avatar_variants = {}
+        instance.save(update_fields=["avatar", "avatar_variants"])
+        schedule_variants(instance, "avatar", "avatar_variants", stale)
+        return instance
+
 
 class UserWithRecipesSerializer(AnyUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(AnyUserSerializer.Meta):
         fields = AnyUserSerializer.Meta.fields + (
@@ -57,12 +80,10 @@ class UserWithRecipesSerializer(AnyUserSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get("request")
-        limit = request.query_params.get("recipes_limit")
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        recipes = getattr(obj, "recent_recipes", None)
+        if recipes is None:
+            limit = get_recipes_limit(self.context.get("request"))
+            recipes = obj.recipes.all()
+            if limit:
+                recipes = recipes[:limit]
         return RecipeMinifiedSerializer(recipes, many=True).data
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
@@ -0,0 +1,21 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .auth import invalidate_user_tokens, token_cache
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    transaction.on_commit(partial(token_cache.delete, instance.key))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(partial(invalidate_user_tokens, instance.pk))
@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .auth import CachedTokenAuthentication, token_cache
+from .models import User
+
+
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            username="user",
+            first_name="User",
+            last_name="User",
+            password="user-password",
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def test_logout_during_lookup_does_not_cache_token(self):
+        key = self.token.key
+        generation = token_cache.generation(key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        token_cache.set(key, self.user, generation)
+        self.assertIsNone(token_cache.get(key))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        response = self.client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_cached_token_authenticates(self):
+        authentication = CachedTokenAuthentication()
+        self.assertEqual(
+            authentication.authenticate_credentials(self.token.key)[0],
+            self.user,
+        )
+        self.assertEqual(token_cache.get(self.token.key), self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def authenticate(self):
+        authentication = CachedTokenAuthentication()
+        return authentication.authenticate_credentials(self.token.key)[0]
+
+    def test_token_delete_invalidates_cache(self):
+        self.authenticate()
+        key = self.token.key
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertIsNone(token_cache.get(key))
+
+    def test_queryset_update_invalidates_cache(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(
+                recipes_count=F("recipes_count") + 1
+            )
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.authenticate().recipes_count, 1)
+
+    def test_deactivation_rejects_cached_token(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        response = self.client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_avatar_delete_keeps_counters(self):
+        user = self.authenticate()
+        User.objects.filter(pk=user.pk).update(
+            followers_count=2, avatar_variants={"small": "missing.jpg"}
+        )
+        self.client.force_authenticate(user, self.token)
+        response = self.client.delete("/api/users/me/avatar/")
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.followers_count, 2)
+        self.assertEqual(self.user.avatar_variants, {})
+
+    def test_set_password_keeps_counters(self):
+        user = self.authenticate()
+        User.objects.filter(pk=user.pk).update(recipes_count=3)
+        self.client.force_authenticate(user, self.token)
+        response = self.client.post("/api/users/set_password/", {
+            "current_password": "user-password",
+            "new_password": "new-user-password",
+        })
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 3)
+        self.assertTrue(self.user.check_password("new-user-password"))
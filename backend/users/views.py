@@ -1,4 +1,11 @@
+from django.db.models import F, Value, Window
+from django.db.models.functions import RowNumber
+from django.db.transaction import atomic
 from djoser.views import UserViewSet as DjoserUserViewSet
+from recipes import feed
+from recipes.counters import change_counter
+from recipes.images import delete_variants
+from recipes.models import Recipe
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.pagination import LimitOffsetPagination
@@ -6,7 +13,35 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from .models import Follow, User
-from .serializers import SetAvatarSerializer, UserWithRecipesSerializer
+from .serializers import (SetAvatarSerializer, UserWithRecipesSerializer,
+                          get_recipes_limit)
+
+
+def subscribed_authors(user):
+    return User.objects.filter(following__user=user).annotate(
+        is_subscribed=Value(True)
+    )
+
+
+def recent_recipes(authors, limit):
+    recipes = Recipe.objects.filter(author__in=authors).annotate(
+        row_number=Window(
+            RowNumber(),
+            partition_by=F("author_id"),
+            order_by=[F("pub_date").desc(), F("id").desc()],
+        )
+    )
+    if limit:
+        recipes = recipes.filter(row_number__lte=limit)
+    return recipes.order_by("author_id", "row_number")
+
+
+def attach_recipes(authors, recipes):
+    recent = {author.id: [] for author in authors}
+    for recipe in recipes:
+        recent[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recent_recipes = recent[author.id]
 
 
 class UserViewSet(DjoserUserViewSet):
@@ -24,16 +59,24 @@ class UserViewSet(DjoserUserViewSet):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["post"])
+    def set_password(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        request.user.set_password(serializer.data["new_password"])
+        request.user.save(update_fields=["password"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(
         detail=False,
         methods=["get"],
         permission_classes=[IsAuthenticated],
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(
-            following__user=request.user,
+        page = self.paginate_queryset(subscribed_authors(request.user))
+        attach_recipes(
+            page, recent_recipes(page, get_recipes_limit(request))
         )
-        page = self.paginate_queryset(queryset)
         serializer = UserWithRecipesSerializer(
             page,
             many=True,
@@ -46,6 +89,7 @@ class UserViewSet(DjoserUserViewSet):
         methods=["post", "delete"],
         permission_classes=[IsAuthenticated],
     )
+    @atomic
     def subscribe(self, request, id=None):
         author = self.get_object()
         if request.method == "POST":
@@ -63,6 +107,8 @@ class UserViewSet(DjoserUserViewSet):
                     {"errors": "Нельзя подписаться"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            change_counter(User, author.pk, "followers_count", 1)
+            feed.add_author(request.user, author)
             serializer = UserWithRecipesSerializer(
                 author,
                 context={"request": request},
@@ -80,6 +126,8 @@ class UserViewSet(DjoserUserViewSet):
                 {"errors": "Не подписан"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        change_counter(User, author.pk, "followers_count", -deleted_count)
+        feed.remove_author(request.user, author)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -89,6 +137,7 @@ class UserViewSet(DjoserUserViewSet):
         url_path="me/avatar",
     )
     def me_avatar(self, request):
+        request.user.refresh_from_db(fields=["avatar", "avatar_variants"])
         if request.method == "PUT":
             serializer = SetAvatarSerializer(
                 request.user,
@@ -97,5 +146,10 @@ class UserViewSet(DjoserUserViewSet):
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data)
-        request.user.avatar.delete()
+        delete_variants(
+            request.user.avatar.storage, request.user.avatar_variants
+        )
+        request.user.avatar.delete(save=False)
+        request.user.avatar_variants = {}
+        request.user.save(update_fields=["avatar", "avatar_variants"])
         return Response(status=status.HTTP_204_NO_CONTENT)